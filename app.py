@@ -1,15 +1,35 @@
+import argparse
 import os
+import threading
 import time
 import requests
 import warnings
 import dspy
-import re
 import litellm
 import mlflow
 from dspy.teleprompt import GEPA
+from budget import stop_callbacks
+from cascade import EvaluationPhase, PromotionRung, ScreenedAcceptance
+from checkpoint import CheckpointCallback, load_meta, new_run_dir, resolve_run_dir, write_text_atomic
+from llm_cache import CachedLM, ResponseCache
+from lm_profiler import LMProfiler
+from mlflow_sink import MlflowSink
+from scheduler import AdaptiveLimiter
+from rules import SEMANTIC_RULES, TOTAL_RULES, check_story, mark_aborted, split_aborted, stream_abort_reason
+from streaming import FieldStreamGuard
 
 # --- GLOBALE VARIABLEN ---
 best_score_so_far = -1.0
+best_prompt_version = 0
+metric_step = 0
+# story_metric läuft in mehreren GEPA-Threads gleichzeitig
+metric_lock = threading.Lock()
+# MLflow hält den aktiven Run thread-lokal, daher die Run-ID explizit merken
+mlflow_run_id = None
+# Hintergrund-Logger für den heißen Pfad (wird mit dem MLflow-Run angelegt)
+metric_sink = None
+# Hält metric_step und Bestwert in checkpoint.json aktuell (wird mit dem Checkpoint angelegt)
+checkpoint_callback = None
 
 # --- STABILITÄTS-SETUP ---
 warnings.filterwarnings("ignore")
@@ -21,7 +41,6 @@ litellm.request_timeout = 1500
 ml_host = os.environ.get('MLFLOW_HOST', 'mlflow-server')
 ml_port = os.environ.get('MLFLOW_PORT', '5000')
 mlflow.set_tracking_uri(f"http://{ml_host}:{ml_port}")
-mlflow.set_experiment("Story_Optimization_GEPA")
 
 # --- 1. ZENTRALE REGEL-DEFINITION ---
 STORY_CONSTRAINTS = """
@@ -44,10 +63,22 @@ class StoryTask(dspy.Signature):
     prompt_text = dspy.InputField(desc="Thema/Handlung der Geschichte.")
     story = dspy.OutputField(desc="### Titel\n\n[6 sehr lange Absätze]\n\nLetztes Zeichen: ?")
 
+# Nur die semantischen Regeln gehen an den Judge, der Rest wird in rules.py lokal geprüft
+SEMANTIC_CONSTRAINTS = "\n".join(
+    line for line in STORY_CONSTRAINTS.strip().splitlines() if int(line.split(".")[0]) in SEMANTIC_RULES
+)
+
 class DynamicJudgeSignature(dspy.Signature):
-    __doc__ = f"Prüfe den Text extrem präzise auf die Einhaltung der 11 technischen Vorgaben (Ja/Nein):\n{STORY_CONSTRAINTS}"
+    __doc__ = f"Prüfe den Text extrem präzise auf die Einhaltung dieser inhaltlichen Vorgaben (True/False je Regel):\n{SEMANTIC_CONSTRAINTS}"
     text = dspy.InputField()
-    assessment = dspy.OutputField(desc="11 Zeilen mit Ja oder Nein.")
+    charaktere: bool = dspy.OutputField(desc="Regel 4: Genau zwei Brüder (Jungs) als Hauptpersonen?")
+    teamplay: bool = dspy.OutputField(desc="Regel 5: Lösen die Brüder das Problem durch Zusammenarbeit?")
+    stimmung: bool = dspy.OutputField(desc="Regel 6: Ruhige, friedliche Einschlaf-Atmosphäre?")
+    happy_end: bool = dspy.OutputField(desc="Regel 9: Positives, geborgenes Ende?")
+    fantasy: bool = dspy.OutputField(desc="Regel 10: Sanfte magische Elemente?")
+
+JUDGE_FIELDS = {4: "charaktere", 5: "teamplay", 6: "stimmung", 9: "happy_end", 10: "fantasy"}
+RULE_TEXT = {int(line.split(".")[0]): line for line in STORY_CONSTRAINTS.strip().splitlines()}
 
 # --- 3. INFRASTRUKTUR & LM SETUP ---
 def wait_for_ollama():
@@ -60,60 +91,197 @@ def wait_for_ollama():
         except: pass
         time.sleep(2)
 
-wait_for_ollama()
+# Persistenter Antwort-Cache (LLM_CACHE=0 umgeht ihn); ersetzt den flüchtigen DSPy-Cache
+response_cache = None
+if os.environ.get("LLM_CACHE", "1") != "0":
+    response_cache = ResponseCache(
+        os.environ.get("LLM_CACHE_PATH", "llm_cache.sqlite"),
+        max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "5000")),
+        namespace=STORY_CONSTRAINTS,
+    )
+
+# Getrennte, adaptive Pools pro Modell: Generierung und Judge überlappen sich,
+# ohne Ollama mit mehr parallelen Requests zu fluten als es in der Timeout-Zeit schafft
+max_parallel = int(os.environ.get("OLLAMA_MAX_PARALLEL", "2"))
+eval_threads = int(os.environ.get("EVAL_THREADS", "4"))
+execution_limiter = AdaptiveLimiter("execution", maximum=max_parallel, timeout=litellm.request_timeout)
+reflection_limiter = AdaptiveLimiter("reflection", maximum=max_parallel, timeout=litellm.request_timeout)
 
-lm_config = {"api_base": os.environ["OLLAMA_URL"], "api_key": "ollama", "max_tokens": 4000}
-execution_lm = dspy.LM(model=os.environ["EXECUTION_LLM"], temperature=0.6, **lm_config)
-reflection_lm = dspy.LM(model=os.environ["REFLECTION_LLM"], temperature=0.7, **lm_config)
+# Zeichnet jeden LM-Aufruf mit Rolle und GEPA-Iteration auf (Tokens, TTFT, Latenz, Retries)
+lm_profiler = LMProfiler()
+
+lm_config = {"api_base": os.environ["OLLAMA_URL"], "api_key": "ollama", "max_tokens": 4000, "cache": False, "response_cache": response_cache, "profiler": lm_profiler}
+execution_lm = CachedLM(model=os.environ["EXECUTION_LLM"], temperature=0.6, limiter=execution_limiter, role="student", **lm_config)
+# Standardrolle "reflector" (GEPA-Vorschläge); story_metric setzt für den Judge die Rolle "judge"
+reflection_lm = CachedLM(model=os.environ["REFLECTION_LLM"], temperature=0.7, limiter=reflection_limiter, role="reflector", **lm_config)
 dspy.settings.configure(lm=execution_lm)
 
+# Bewertungs-Kaskade (cascade.py): kleiner Vorab-Judge für GEPAs Minibatches, voller Judge auf dem
+# Valset nur für Kandidaten, die das Screening überleben.
+# SCREEN_LLM leer lassen, um jede Story direkt vom vollen Judge bewerten zu lassen.
+screen_lm = None
+screen_limiter = None
+if os.environ.get("SCREEN_LLM"):
+    screen_limiter = AdaptiveLimiter("screen", maximum=max_parallel, timeout=litellm.request_timeout)
+    screen_lm = CachedLM(model=os.environ["SCREEN_LLM"], temperature=0.0, limiter=screen_limiter, role="screen", **lm_config)
+full_judge_rung = PromotionRung(eta=int(os.environ.get("CASCADE_ETA", "2")))
+evaluation_phase = EvaluationPhase(screening_enabled=screen_lm is not None)
+
 # --- 4. METRIK (Inkl. Best Prompt Tracker & MLflow) ---
-def story_metric(gold, pred, trace=None, pred_name=None, pred_trace=None):
-    global best_score_so_far
-    story_content = getattr(pred, 'story', "")
-    if not story_content or len(str(story_content)) < 150: return 0.0
-    
-    with dspy.context(lm=reflection_lm):
-        judge = dspy.Predict(DynamicJudgeSignature)
-        result = judge(text=story_content)
-    
-    raw_output = str(result.assessment).lower()
-    ja_count = raw_output.count("ja")
-    words = len(re.findall(r'\w+', story_content))
-    
+def story_score(passed_rules, words, paragraphs):
     # Wortzahl-Logik
     word_score = 1.0 if 600 <= words <= 850 else (0.4 if words > 400 else 0.1)
-    # Absatz-Logik
-    paragraphs = [p for p in story_content.split('\n\n') if len(p.strip()) > 30]
-    p_score = 1.0 if len(paragraphs) == 6 else 0.5
-    
-    final_score = float((ja_count / 11.0) * word_score * p_score)
+    # Absatz-Logik (ohne Header-Zeile)
+    p_score = 1.0 if paragraphs == 6 else 0.5
+    return float((passed_rules / TOTAL_RULES) * word_score * p_score)
+
+def judge_semantic(lm, role, text):
+    """Verletzte semantische Regeln laut lm, oder None, wenn die Antwort nicht auswertbar ist."""
+    try:
+        with dspy.context(lm=lm), lm_profiler.role(role):
+            result = dspy.Predict(DynamicJudgeSignature)(text=text)
+    except Exception as e:
+        print(f"Judge-Antwort nicht auswertbar ({role}): {e}")
+        return None
+    return [rule for rule, name in JUDGE_FIELDS.items() if getattr(result, name, False) is not True]
+
+def story_metric(gold, pred, trace=None, pred_name=None, pred_trace=None):
+    global best_score_so_far, best_prompt_version, metric_step
+    story_content, abort_reason = split_aborted(str(getattr(pred, 'story', "") or ""))
+    if len(story_content) < 150:
+        feedback = f"Generierung abgebrochen: {abort_reason}" if abort_reason else "Keine oder viel zu kurze Story."
+        return dspy.Prediction(score=0.0, feedback=feedback)
     
-    if mlflow.active_run():
-        mlflow.log_metric("current_score", final_score)
-        mlflow.log_metric("word_count", words)
-
-    if final_score > best_score_so_far:
-        best_score_so_far = final_score
-        with open("best_prompt.txt", "w", encoding="utf-8") as f:
-            f.write(f"--- Highscore: {final_score} ---\n")
-            f.write(f"Wortzahl: {words} | Ja-Punkte: {ja_count}\n")
-            f.write("-" * 30 + "\n")
-            if trace is not None:
-                f.write(str(trace[0][0].predictor.signature.instructions))
-            else:
-                f.write("Initialer Lauf")
-        print(f" >>> Neuer Bestwert: {final_score}! In best_prompt.txt gesichert.")
-
-    return final_score
+    report = check_story(story_content)
+    words = report.words
+    failed_rules = report.failed
+
+    # Kaskade: Stufe 1 Struktur (lokal), Stufe 2 Vorab-Judge für GEPAs Minibatches, Stufe 3 voller Judge.
+    # Semantische Regeln ohne Urteil bringen keine Punkte, gelten aber nicht als verletzt.
+    semantic_failed = []
+    unchecked = list(SEMANTIC_RULES)
+    judge_failed = False
+    stage = 1
+    judge_latency = 0.0
+    if not (report.hard_fail or abort_reason):
+        judge_start = time.monotonic()
+        judge_lm, role = (screen_lm, "screen") if evaluation_phase.screening else (reflection_lm, "judge")
+        # Ein Judge-Ausfall wird nicht wie in der Baseline als Fehler weitergereicht (GEPA wertet den
+        # Aufruf dann mit 0.0 ohne Feedback), sondern mit den lokal geprüften Punkten und eigenem Hinweis
+        judged = judge_semantic(judge_lm, role, story_content)
+        if judged is not None:
+            semantic_failed, unchecked = judged, []
+            stage = 2 if role == "screen" else 3
+        else:
+            judge_failed = True
+        judge_latency = time.monotonic() - judge_start
+    judge_passed = len(SEMANTIC_RULES) - len(semantic_failed) - len(unchecked)
+    failed_rules += semantic_failed
+    ja_count = report.passed_count + judge_passed
+
+    final_score = story_score(ja_count, words, report.paragraphs)
+    # Student- und Judge-Aufrufe dieses Metrik-Aufrufs (laufen im selben Thread)
+    lm_breakdown = lm_profiler.take_breakdown()
+
+    with metric_lock:
+        metric_step += 1
+        step = metric_step
+        snapshot = None
+        # Bestwerte nur aus Urteilen des vollen Judges: Screening-Scores sind zu grob, ohne Urteil ist der Score nur eine Untergrenze
+        if stage != 2 and not judge_failed and final_score > best_score_so_far:
+            best_score_so_far = final_score
+            best_prompt_version += 1
+            version = best_prompt_version
+            predictor = trace[0][0] if trace else None
+            instructions = str(predictor.signature.instructions) if hasattr(predictor, "signature") else None
+            if instructions is None and evaluation_phase.candidate:
+                # Valset-Bewertung läuft ohne Traces, den Kandidaten kennt der GEPA-Callback
+                instructions = "\n\n".join(evaluation_phase.candidate.values())
+            snapshot = (
+                f"--- Highscore: {final_score} ---\n"
+                f"Wortzahl: {words} | Ja-Punkte: {ja_count}\n"
+                + "-" * 30 + "\n"
+                + (instructions or "Initialer Lauf")
+            )
+            write_text_atomic("best_prompt.txt", snapshot)
+            print(f" >>> Neuer Bestwert: {final_score}! In best_prompt.txt gesichert.")
+        if checkpoint_callback is not None:
+            checkpoint_callback.save_progress(
+                metric_step=metric_step, best_score=best_score_so_far, best_prompt_version=best_prompt_version
+            )
+
+    if metric_sink is not None:
+        metric_sink.log_metrics({
+            "current_score": final_score,
+            "word_count": words,
+            "judge_yes_count": judge_passed,
+            "judge_latency_s": judge_latency,
+            "aborted": float(abort_reason is not None),
+            "judge_failed": float(judge_failed),
+            "cascade_stage": stage,
+            **full_judge_rung.stats(),
+            **{f"metric_{key}": value for key, value in lm_breakdown.items()},
+            **execution_limiter.stats(),
+            **reflection_limiter.stats(),
+            **(screen_limiter.stats() if screen_limiter is not None else {}),
+        }, step=step)
+        if snapshot is not None:
+            metric_sink.log_text(snapshot, f"best_prompts/best_prompt_v{version:03d}.txt")
+
+    # Feedback für GEPAs Reflexion: Abbruchgrund und konkret verletzte Regeln
+    feedback = [f"Score {final_score:.2f} | Wortzahl: {words} | Absätze: {report.paragraphs} | erfüllte Regeln: {ja_count}/{TOTAL_RULES}"]
+    if abort_reason:
+        feedback.append(f"Generierung vorzeitig abgebrochen: {abort_reason}")
+    if judge_failed:
+        feedback.append("Judge-Antwort nicht auswertbar: Die inhaltlichen Regeln wurden nicht geprüft und bringen keine Punkte. Das ist kein Verstoß der Story.")
+    elif unchecked:
+        feedback.append("Inhaltliche Regeln nicht geprüft: Die Story scheitert schon an den Strukturregeln.")
+    if failed_rules:
+        feedback.append("Nicht erfüllt:\n" + "\n".join(f"- {RULE_TEXT[rule]}" for rule in sorted(failed_rules)))
+    if unchecked:
+        feedback.append("Nicht geprüft: Regeln " + ", ".join(str(rule) for rule in sorted(unchecked)))
+    return dspy.Prediction(score=final_score, feedback="\n".join(feedback))
+
+def cascade_gepa_kwargs(callbacks=()):
+    """gepa_kwargs für die Kaskade: Phasen-Callback und, mit SCREEN_LLM, Beförderung pro Kandidat."""
+    kwargs = {"callbacks": [*callbacks, evaluation_phase]}
+    if screen_lm is not None:
+        # Aufs Valset (voller Judge) nur nach überlebtem Screening
+        kwargs["acceptance_criterion"] = ScreenedAcceptance(full_judge_rung, evaluation_phase)
+    return kwargs
 
 # --- 5. MODUL ---
+# Streaming-Modus: Tokens laufend prüfen und bei aussichtslosen Stories früh abbrechen
+STORY_STREAMING = os.environ.get("STORY_STREAMING", "1") != "0"
+story_stream_guard = FieldStreamGuard("story", stream_abort_reason, mark_aborted)
+
 class StoryStudent(dspy.Module):
-    def __init__(self):
+    def __init__(self, stream=STORY_STREAMING):
         super().__init__()
+        self.stream = stream
         self.predictor = dspy.Predict(StoryTask)
-    def forward(self, prompt_text):
-        return self.predictor(prompt_text=prompt_text)
+    def forward(self, prompt_text, rollout_id=None):
+        config = {"stream_guard": story_stream_guard} if self.stream else {}
+        if rollout_id is not None:
+            # Eigener Cache-Eintrag je Versuch, damit ein Retry nicht die verworfene Antwort zurückbekommt
+            config["rollout_id"] = rollout_id
+        return self.predictor(prompt_text=prompt_text, config=config)
+
+# Optimierter Zustand (Instruktionen, Demos) für die Batch-Generierung ohne erneute Optimierung
+OPTIMIZED_PROGRAM = os.environ.get("OPTIMIZED_PROGRAM", "optimized_program.json")
+
+def save_program(program, path=OPTIMIZED_PROGRAM):
+    # dspy wählt das Format über die Endung, daher .json auch für die Temp-Datei
+    tmp_path = path + ".tmp.json"
+    program.save(tmp_path)
+    os.replace(tmp_path, path)
+
+def load_program(path=OPTIMIZED_PROGRAM, **kwargs):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Kein optimiertes Programm unter {path}. Erst optimieren: python app.py")
+    program = StoryStudent(**kwargs)
+    program.load(path)
+    return program
 
 # --- 6. DATENSATZ (GOLDSTANDARD EXAMPLES) ---
 all_examples = [
@@ -203,32 +371,141 @@ trainset = all_examples[:3]
 valset = all_examples[3:]
 
 # --- 7. OPTIMIERUNG ---
-print("Starte GEPA Optimierung mit Best-Prompt-Tracking...")
+# Budget: Metrik-Aufrufe, Wanduhrzeit und/oder Tokens; es gilt, was zuerst erreicht ist.
+# Ist nur Zeit oder Tokens gesetzt, sind die Metrik-Aufrufe unbegrenzt.
+DEFAULT_MAX_METRIC_CALLS = 25
+UNLIMITED_METRIC_CALLS = 10**9
+
+def env_number(name, cast):
+    value = os.environ.get(name)
+    return cast(value) if value else None
+
+def optimize(resume=None, max_metric_calls=None, max_minutes=None, max_tokens=None):
+    global metric_step, best_score_so_far, best_prompt_version, mlflow_run_id, metric_sink, checkpoint_callback
+    if max_metric_calls is None:
+        max_metric_calls = UNLIMITED_METRIC_CALLS if (max_minutes or max_tokens) else DEFAULT_MAX_METRIC_CALLS
+    print("Starte GEPA Optimierung mit Best-Prompt-Tracking...")
+    optimized_student = None
+
+    # GEPA speichert seinen Zustand nach jeder Iteration in run_dir und setzt dort fort
+    if resume:
+        run_dir = resolve_run_dir(resume)
+        checkpoint_meta = load_meta(run_dir)
+        # Ältere Checkpoints kennen nur GEPAs Budget-Zähler
+        metric_step = checkpoint_meta.get("metric_step", checkpoint_meta.get("metric_calls_used", 0))
+        best_score_so_far = checkpoint_meta.get("best_score", -1.0)
+        best_prompt_version = checkpoint_meta.get("best_prompt_version", 0)
+        print(f"Setze fort ab Checkpoint {run_dir} (Iteration {checkpoint_meta.get('iteration', '?')}).")
+    else:
+        run_dir = new_run_dir()
+        checkpoint_meta = {}
+
+    with mlflow.start_run(run_id=checkpoint_meta.get("mlflow_run_id")) as run:
+        mlflow_run_id = run.info.run_id
+        if not resume:
+            mlflow.log_param("optimizer", "GEPA")
+            mlflow.log_param("max_tokens", 4000)
+            mlflow.log_param("llm_cache", response_cache is not None)
+            mlflow.log_param("eval_threads", eval_threads)
+            mlflow.log_param("ollama_max_parallel", max_parallel)
+            mlflow.log_param("execution_llm", execution_lm.model)
+            mlflow.log_param("reflection_llm", reflection_lm.model)
+            mlflow.log_param("screen_llm", screen_lm.model if screen_lm is not None else "")
+            mlflow.log_param("cascade_eta", full_judge_rung.eta)
+            mlflow.log_param("budget_metric_calls", max_metric_calls)
+            mlflow.log_param("budget_minutes", max_minutes or "")
+            mlflow.log_param("budget_tokens", max_tokens or "")
+        mlflow.set_tag("checkpoint_dir", run_dir)
+        metric_sink = MlflowSink(mlflow_run_id)
+        lm_profiler.sink = metric_sink
+
+        checkpoint_callback = CheckpointCallback(run_dir, mlflow_run_id, meta=checkpoint_meta)
+        gepa_kwargs = {
+            **cascade_gepa_kwargs([checkpoint_callback, lm_profiler]),
+            "stop_callbacks": stop_callbacks(lm_profiler, max_minutes=max_minutes, max_tokens=max_tokens),
+        }
+        optimizer = GEPA(
+            metric=story_metric,
+            reflection_lm=reflection_lm,
+            max_metric_calls=max_metric_calls,
+            # Die Threads überlappen Generierung und Judge; die Last auf Ollama begrenzen die Limiter
+            num_threads=eval_threads,
+            log_dir=run_dir,
+            gepa_kwargs=gepa_kwargs,
+        )
 
-with mlflow.start_run():
-    mlflow.log_param("optimizer", "GEPA")
-    mlflow.log_param("max_tokens", 4000)
-    
-    optimizer = GEPA(
-        metric=story_metric,
-        reflection_lm=reflection_lm,
-        max_metric_calls=25,
-        num_threads=1 # Nur 1 Thread um Ressourcen/Timeouts zu schonen
-    )
-
-    try:
-        optimized_student = optimizer.compile(StoryStudent(), trainset=trainset, valset=valset)
+        try:
+            optimized_student = optimizer.compile(StoryStudent(), trainset=trainset, valset=valset)
         
-        # Finalen Stand sichern
-        final_instr = optimized_student.predictor.signature.instructions
-        mlflow.log_text(final_instr, "final_optimized_prompt.txt")
-        with open("best_prompt.txt", "a", encoding="utf-8") as f:
-            f.write("\n\n" + "="*40 + "\nFINALER OPTIMIERTER PROMPT:\n" + final_instr)
+            # Finalen Stand sichern
+            final_instr = optimized_student.predictor.signature.instructions
+            metric_sink.log_text(final_instr, "final_optimized_prompt.txt")
+            save_program(optimized_student)
+            with open(OPTIMIZED_PROGRAM, encoding="utf-8") as f:
+                metric_sink.log_text(f.read(), os.path.basename(OPTIMIZED_PROGRAM))
+            best_prompt_text = ""
+            if os.path.exists("best_prompt.txt"):
+                with open("best_prompt.txt", encoding="utf-8") as f:
+                    best_prompt_text = f.read()
+            write_text_atomic("best_prompt.txt", best_prompt_text + "\n\n" + "="*40 + "\nFINALER OPTIMIERTER PROMPT:\n" + final_instr)
             
-        print("\nPROMPT OPTIMIERT. Höchster Score in best_prompt.txt und MLflow.")
-    except Exception as e:
-        print(f"Fehler: {e}")
+            print(f"\nPROMPT OPTIMIERT. Höchster Score in best_prompt.txt und MLflow, Programm in {OPTIMIZED_PROGRAM}.")
+        except Exception as e:
+            print(f"Fehler: {e}")
+            print(f"Fortsetzen mit: python app.py --resume {run_dir}")
+        finally:
+            # Abschlusswerte ebenfalls über den Sink, damit ein nicht erreichbares MLflow den Lauf nicht abbricht
+            lm_profiler.sink = None
+            profile_rows = lm_profiler.summary()
+            profile_table = lm_profiler.format_table(profile_rows)
+            print(f"\nLM-PROFIL:\n{profile_table}")
+            metric_sink.log_metrics(lm_profiler.summary_metrics(profile_rows), step=metric_step)
+            metric_sink.log_text(profile_table, "lm_profile.txt")
+            if response_cache is not None:
+                cache_stats = response_cache.stats()
+                metric_sink.log_metrics(cache_stats, step=metric_step)
+                print(f"LLM-Cache: {cache_stats['cache_hits']} Treffer, {cache_stats['cache_misses']} Fehlgriffe.")
+            # Puffer leeren, bevor der Run geschlossen wird
+            metric_sink.close()
+            if metric_sink.dropped or metric_sink.dropped_texts:
+                print(
+                    f"MLflow-Sink: {metric_sink.dropped} Metriken und {metric_sink.dropped_texts} Artefakte "
+                    "verworfen (Server zu lange nicht erreichbar)."
+                )
+
+    return optimized_student
+
+def main():
+    parser = argparse.ArgumentParser(description="GEPA-Optimierung des Story-Prompts")
+    parser.add_argument(
+        "--resume", nargs="?", const="latest", default=None, metavar="RUN_DIR",
+        help="Vom letzten (oder angegebenen) Checkpoint fortsetzen statt neu zu starten.",
+    )
+    parser.add_argument(
+        "--max-metric-calls", type=int, default=env_number("GEPA_MAX_METRIC_CALLS", int),
+        help=f"Budget in Metrik-Aufrufen (Standard {DEFAULT_MAX_METRIC_CALLS}, unbegrenzt wenn nur Zeit/Tokens gesetzt).",
+    )
+    parser.add_argument(
+        "--max-minutes", type=float, default=env_number("GEPA_MAX_MINUTES", float),
+        help="Budget in Minuten Wanduhrzeit, z.B. 480 für ein Nachtfenster.",
+    )
+    parser.add_argument(
+        "--max-tokens", type=int, default=env_number("GEPA_MAX_TOKENS", int),
+        help="Budget in verbrauchten Tokens (Prompt + Completion, ohne Cache-Treffer).",
+    )
+    args = parser.parse_args()
+
+    wait_for_ollama()
+    mlflow.set_experiment("Story_Optimization_GEPA")
+    optimized_student = optimize(
+        resume=args.resume,
+        max_metric_calls=args.max_metric_calls,
+        max_minutes=args.max_minutes,
+        max_tokens=args.max_tokens,
+    )
+    if optimized_student is not None:
+        res = optimized_student(prompt_text="Zwei Brüder erforschen eine alte Burgruine.")
+        print(f"\nFINALE STORY:\n{res.story}")
 
 if __name__ == "__main__":
-    res = optimized_student(prompt_text="Zwei Brüder erforschen eine alte Burgruine.")
-    print(f"\nFINALE STORY:\n{res.story}")
\ No newline at end of file
+    main()
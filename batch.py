@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# --- BATCH-GENERIERUNG ---
+# Erzeugt Stories für beliebig viele Prompts mit dem gespeicherten, optimierten
+# Programm (app.OPTIMIZED_PROGRAM), ohne erneut zu optimieren. Die Eingabe wird
+# zeilenweise aus einer JSONL-Datei gelesen, es sind nie mehr als --concurrency
+# Prompts gleichzeitig in Arbeit, und jedes Ergebnis wird sofort an die
+# Ausgabe-JSONL angehängt. Der Speicherbedarf bleibt dadurch flach, und ein
+# abgebrochener Job setzt beim nächsten Start mit denselben Dateien fort:
+# IDs, die bereits mit status "ok" in der Ausgabe stehen, werden übersprungen.
+# Bei mehreren Einträgen zu einer ID gilt der letzte.
+# Ctrl-C schreibt fertige Ergebnisse noch weg und beendet den Prozess dann hart
+# (os._exit): Laufende HTTP-Requests an Ollama lassen sich nicht abbrechen, und
+# die Worker-Threads des Pools würden beim normalen Beenden abgewartet, im
+# schlimmsten Fall bis zum Timeout von 25 Minuten je Generierung. Die betroffenen
+# IDs werden beim nächsten Start neu erzeugt.
+
+
+def parse_args(default_concurrency):
+    parser = argparse.ArgumentParser(description="Stories für eine JSONL-Datei mit Prompts erzeugen")
+    parser.add_argument("input", help="JSONL mit einem Objekt pro Zeile, z.B. {\"id\": \"42\", \"prompt_text\": \"...\"}.")
+    parser.add_argument("output", help="JSONL, an die die Ergebnisse angehängt werden.")
+    parser.add_argument("--id-field", default="id", help="Feld mit der eindeutigen ID (fehlt es, gilt die Zeilennummer).")
+    parser.add_argument("--prompt-field", default="prompt_text", help="Feld mit dem Thema der Story.")
+    parser.add_argument("--concurrency", type=int, default=default_concurrency, help="Gleichzeitig bearbeitete Prompts.")
+    parser.add_argument("--retries", type=int, default=2, help="Weitere Versuche, wenn die Regel-Checks scheitern.")
+    return parser.parse_args()
+
+
+def completed_ids(path):
+    """IDs, die in einer vorhandenen Ausgabe bereits erfolgreich erzeugt wurden."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Beim Abbruch halb geschriebene letzte Zeile
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+            else:
+                done.discard(record.get("id"))
+    return done
+
+
+def read_prompts(path, id_field, prompt_field):
+    """Liest die Eingabe lazy und liefert (id, prompt) je gültiger Zeile."""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                prompt = item[prompt_field]
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                print(f"Zeile {line_no} übersprungen: {e!r}")
+                continue
+            yield str(item.get(id_field, f"line-{line_no}")), prompt
+
+
+def generate(app, student, item_id, prompt, retries, stop=None):
+    """Erzeugt eine Story und prüft sie mit den Regel-Checks; bei Verstoß bis zu retries weitere Versuche."""
+    best = None
+    start = time.monotonic()
+    attempts = 0
+    for attempt in range(retries + 1):
+        if attempt and stop is not None and stop.is_set():
+            # Abbruch: keine weiteren Versuche, der beste bisherige wird zurückgegeben
+            break
+        attempts = attempt + 1
+        record = {"id": item_id, "prompt_text": prompt, "attempts": attempts}
+        try:
+            # Erster Versuch darf aus dem Cache kommen, Retries brauchen eine neue Antwort
+            pred = student(prompt_text=prompt, rollout_id=attempt or None)
+        except Exception as e:
+            record.update(status="failed", error=repr(e))
+            best = best or record
+            continue
+        story, abort_reason = app.split_aborted(str(getattr(pred, "story", "") or ""))
+        report = app.check_story(story)
+        record.update(
+            story=story,
+            words=report.words,
+            paragraphs=report.paragraphs,
+            failed_rules=report.failed,
+            abort_reason=abort_reason,
+        )
+        if not report.failed and abort_reason is None:
+            record["status"] = "ok"
+            best = record
+            break
+        record["status"] = "failed"
+        # Beim endgültigen Scheitern den Versuch mit den wenigsten Verstößen behalten
+        if best is None or "story" not in best or len(report.failed) < len(best["failed_rules"]):
+            best = record
+    best["attempts"] = attempts
+    best["latency_s"] = round(time.monotonic() - start, 2)
+    return best
+
+
+def run(app, args):
+    student = app.load_program()
+    done = completed_ids(args.output)
+    if done:
+        print(f"Setze fort: {len(done)} IDs in {args.output} bereits erledigt.")
+
+    counts = {"ok": 0, "failed": 0, "skipped": 0}
+    stop = threading.Event()
+    start = time.monotonic()
+    with open(args.output, "a", encoding="utf-8") as out:
+        if out.tell() and not _ends_with_newline(args.output):
+            # Abgeschnittene letzte Zeile abschließen, damit die nächste gültig bleibt
+            out.write("\n")
+        pool = ThreadPoolExecutor(max_workers=args.concurrency)
+        pending = set()
+        try:
+            for item_id, prompt in read_prompts(args.input, args.id_field, args.prompt_field):
+                if item_id in done:
+                    counts["skipped"] += 1
+                    continue
+                # Doppelte IDs in der Eingabe nur einmal erzeugen
+                done.add(item_id)
+                pending.add(pool.submit(generate, app, student, item_id, prompt, args.retries, stop))
+                if len(pending) >= args.concurrency:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _write_results(out, finished, counts, start)
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _write_results(out, finished, counts, start)
+        except KeyboardInterrupt:
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            # Was schon fertig ist, nicht verwerfen
+            finished = {f for f in pending if f.done() and not f.cancelled()}
+            if finished:
+                _write_results(out, finished, counts, start)
+            raise
+        pool.shutdown()
+    return counts
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _write_results(out, finished, counts, start):
+    for future in finished:
+        record = future.result()
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        counts[record["status"]] += 1
+    out.flush()
+    written = counts["ok"] + counts["failed"]
+    rate = written / (time.monotonic() - start) * 60
+    print(f"{written} erzeugt ({counts['ok']} ok, {counts['failed']} fehlgeschlagen) | {rate:.1f} Stories/min")
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app
+
+    args = parse_args(app.eval_threads)
+    app.wait_for_ollama()
+    try:
+        counts = run(app, args)
+    except KeyboardInterrupt:
+        print("\nAbgebrochen. Fortsetzen mit demselben Aufruf, erledigte IDs werden übersprungen.")
+        # Harter Exit, siehe oben: sonst warten wir auf alle laufenden Generierungen
+        os._exit(130)
+    print(f"Fertig: {counts['ok']} ok, {counts['failed']} fehlgeschlagen, {counts['skipped']} übersprungen.")
+    print(f"\nLM-PROFIL:\n{app.lm_profiler.format_table()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fake_llm_server import start_server_process
+
+# --- OFFLINE-BENCHMARK ---
+# Treibt StoryStudent, story_metric und einen kompletten GEPA-Lauf gegen einen
+# lokalen Fake-Server (fake_llm_server.py) statt gegen Ollama. Damit lassen sich
+# Scheduler-, Cache- und Metrik-Änderungen ohne GPU und Netzwerk vergleichen.
+# Jedes Szenario läuft in einem eigenen Prozess mit eigenem Fake-Server: Die
+# Spitzen-RSS (ru_maxrss) gilt für den ganzen Prozess und wäre sonst ab dem
+# zweiten Szenario das Maximum aller vorherigen, außerdem teilen sich die
+# Szenarien so weder Cache noch Limiter- oder Bestwert-Zustand.
+SCENARIOS = ("student", "metric", "gepa")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline-Benchmark der Story-Pipeline gegen einen Fake-LLM-Server")
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--n", type=int, default=10, help="Aufrufe je Szenario student/metric.")
+    parser.add_argument("--max-metric-calls", type=int, default=25, help="Budget für das GEPA-Szenario.")
+    parser.add_argument("--ttft", type=float, default=0.05, help="Zeit bis zum ersten Token in Sekunden.")
+    parser.add_argument("--tps", type=float, default=2000.0, help="Tokens pro Sekunde des Fake-Servers.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Anteil der Requests, die mit HTTP 500 scheitern.")
+    parser.add_argument("--bad-story-rate", type=float, default=0.2, help="Anteil der Stories mit überzähligem Absatz.")
+    parser.add_argument("--cache", action="store_true", help="Persistenten LLM-Cache (in einem Temp-Verzeichnis) nutzen.")
+    parser.add_argument("--json", metavar="PATH", help="Ergebnisse zusätzlich als JSON schreiben.")
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServerHandle:
+    def __init__(self, process, url):
+        self.process = process
+        self.url = url
+
+    def _call(self, path, method="GET"):
+        request = urllib.request.Request(self.url.replace("/v1", path), method=method, data=b"" if method == "POST" else None)
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+
+    def reset(self):
+        self._call("/bench/reset", "POST")
+
+    def stats(self):
+        return self._call("/bench/stats")
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+
+
+def setup(args):
+    """Importiert app mit Konfiguration auf den Fake-Server und startet diesen mit den Gold-Stories."""
+    url = f"http://127.0.0.1:{free_port()}/v1"
+    # best_prompt.txt, Cache und Checkpoints landen nicht im Arbeitsverzeichnis
+    workdir = tempfile.mkdtemp(prefix="story_bench_")
+    os.environ.update({
+        "OLLAMA_URL": url,
+        "EXECUTION_LLM": "openai/bench-student",
+        "REFLECTION_LLM": "openai/bench-judge",
+        "SCREEN_LLM": "openai/bench-screen",
+        "LLM_CACHE": "1" if args.cache else "0",
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite"),
+    })
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app
+
+    process = start_server_process(
+        [example.story for example in app.all_examples],
+        port=int(url.rsplit(":", 1)[1].split("/")[0]),
+        ttft=args.ttft,
+        tokens_per_sec=args.tps,
+        failure_rate=args.failure_rate,
+        bad_story_rate=args.bad_story_rate,
+    )
+    os.chdir(workdir)
+    return ServerHandle(process, url), app
+
+
+def counting(fn):
+    lock = threading.Lock()
+
+    def wrapper(*args, **kwargs):
+        with lock:
+            wrapper.calls += 1
+        return fn(*args, **kwargs)
+
+    wrapper.calls = 0
+    return wrapper
+
+
+def run_student(app, args):
+    student = app.StoryStudent()
+    prompts = [app.all_examples[i % len(app.all_examples)].prompt_text for i in range(args.n)]
+    with ThreadPoolExecutor(max_workers=app.eval_threads) as pool:
+        list(pool.map(lambda prompt: student(prompt_text=prompt), prompts))
+    return args.n
+
+
+def run_metric(app, args):
+    import dspy
+
+    metric = counting(app.story_metric)
+    preds = [dspy.Prediction(story=app.all_examples[i % len(app.all_examples)].story) for i in range(args.n)]
+    with ThreadPoolExecutor(max_workers=app.eval_threads) as pool:
+        list(pool.map(lambda pred: metric(None, pred), preds))
+    return metric.calls
+
+
+class ProposalCounter:
+    """GEPA-Callback: zählt Reflexions-Vorschläge mit neuer Anweisung."""
+
+    def __init__(self):
+        self.proposals = 0
+
+    def on_proposal_end(self, event):
+        if event["new_instructions"]:
+            self.proposals += 1
+
+
+def run_gepa(app, args):
+    from dspy.teleprompt import GEPA
+
+    metric = counting(app.story_metric)
+    proposals = ProposalCounter()
+    optimizer = GEPA(
+        metric=metric,
+        reflection_lm=app.reflection_lm,
+        max_metric_calls=args.max_metric_calls,
+        num_threads=app.eval_threads,
+        # Die Gold-Stories des Fake-Servers erreichen oft den Höchstscore; ohne das
+        # würde GEPA die Reflexion überspringen und das Szenario misst sie nicht
+        skip_perfect_score=False,
+        gepa_kwargs=app.cascade_gepa_kwargs([proposals]),
+    )
+    optimizer.compile(app.StoryStudent(), trainset=app.trainset, valset=app.valset)
+    # Ohne neue Kandidaten hätte das Szenario Reflexion und Vorschläge gar nicht gemessen
+    if not proposals.proposals:
+        raise RuntimeError("GEPA hat keinen Kandidaten über den Startprompt hinaus vorgeschlagen.")
+    return metric.calls
+
+
+RUNNERS = {"student": run_student, "metric": run_metric, "gepa": run_gepa}
+
+
+def measure(name, server, app, args):
+    server.reset()
+    start = time.perf_counter()
+    units = RUNNERS[name](app, args)
+    wall = time.perf_counter() - start
+    # Spitzen-RSS des Szenario-Prozesses (tracemalloc würde das Streaming stark ausbremsen)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    stats = server.stats()
+    return {
+        "scenario": name,
+        "wall_s": round(wall, 3),
+        "units": units,
+        "units_per_min": round(units / wall * 60, 2) if wall else 0.0,
+        "llm_calls": stats["requests"],
+        "llm_calls_per_unit": round(stats["requests"] / units, 2) if units else 0.0,
+        "llm_failures": stats["failures"],
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+    }
+
+
+def run_scenario(name, args):
+    """Führt ein Szenario im aktuellen (frischen) Prozess aus; liefert Messwerte und LM-Profil."""
+    server, app = setup(args)
+    try:
+        result = measure(name, server, app, args)
+    finally:
+        server.stop()
+    return result, app.lm_profiler.format_table()
+
+
+def print_table(results):
+    columns = list(results[0])
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in columns}
+    print(" | ".join(c.ljust(widths[c]) for c in columns))
+    print("-+-".join("-" * widths[c] for c in columns))
+    for row in results:
+        print(" | ".join(str(row[c]).ljust(widths[c]) for c in columns))
+
+
+def main():
+    args = parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    # "units" = Generierungen (student) bzw. Metrik-Aufrufe (metric, gepa)
+    results = []
+    profiles = []
+    for name in scenarios:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result, profile = pool.submit(run_scenario, name, args).result()
+        results.append(result)
+        profiles.append((name, profile))
+    print_table(results)
+    for name, profile in profiles:
+        print(f"\nLM-Profil {name}:\n{profile}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import time
+
+# --- BUDGETS FÜR GEPA ---
+# Neben max_metric_calls kann ein Lauf über Wanduhrzeit oder verbrauchte Tokens
+# begrenzt werden (z.B. "nutze das Nachtfenster von 8 Stunden"). GEPA fragt seine
+# stop_callbacks vor jeder Iteration ab; eine laufende Iteration wird also noch
+# zu Ende gebracht. Beide Budgets zählen ab Start dieses Prozesses, auch bei --resume.
+
+
+class WallClockBudget:
+    def __init__(self, max_minutes):
+        self.max_minutes = max_minutes
+        self.start = time.monotonic()
+        self.reported = False
+
+    def __call__(self, gepa_state):
+        elapsed = (time.monotonic() - self.start) / 60
+        if elapsed < self.max_minutes:
+            return False
+        if not self.reported:
+            print(f"Zeitbudget von {self.max_minutes} Minuten erreicht, GEPA stoppt nach dieser Iteration.")
+            self.reported = True
+        return True
+
+
+class TokenBudget:
+    """Stoppt, sobald die LM-Aufrufe (ohne Cache-Treffer) max_tokens Tokens verbraucht haben."""
+
+    def __init__(self, profiler, max_tokens):
+        self.profiler = profiler
+        self.max_tokens = max_tokens
+        self.reported = False
+
+    def __call__(self, gepa_state):
+        used = self.profiler.total_tokens
+        if used < self.max_tokens:
+            return False
+        if not self.reported:
+            print(f"Token-Budget erreicht ({used} von {self.max_tokens}), GEPA stoppt nach dieser Iteration.")
+            self.reported = True
+        return True
+
+
+def stop_callbacks(profiler, max_minutes=None, max_tokens=None):
+    callbacks = []
+    if max_minutes:
+        callbacks.append(WallClockBudget(max_minutes))
+    if max_tokens:
+        callbacks.append(TokenBudget(profiler, max_tokens))
+    return callbacks
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict, deque
+
+# --- MEHRSTUFIGE BEWERTUNG (KASKADE) ---
+# Gestuft wird pro Kandidat, nicht pro Story:
+# Stufe 1: Strukturregeln lokal (rules.py), harte Verstöße enden hier.
+# Stufe 2: kleiner Judge (SCREEN_LLM, z.B. tinyllama) für GEPAs Minibatch-Bewertungen.
+# Eltern- und Kind-Kandidat werden dort auf denselben Trainings-Stories verglichen,
+# und auch das Feedback für die Reflexion stammt aus diesem Urteil.
+# Stufe 3: voller Judge (REFLECTION_LLM) für die Valset-Bewertung. Dorthin kommen
+# nur Kandidaten, die das Screening überleben: Sie schlagen den Elternkandidaten
+# (GEPAs Regel) und ihr Minibatch-Score gehört zu den besten 1/eta der zuletzt
+# gesiebten Kandidaten. Das ist die asynchrone Variante von Successive Halving
+# (ASHA): Kandidaten kommen einzeln, also wird gegen ein gleitendes Fenster befördert.
+# Valset-Scores (Pareto-Front, bester Kandidat, best_prompt) kommen so immer vom vollen Judge.
+
+
+def candidate_key(candidate):
+    payload = json.dumps(candidate, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PromotionRung:
+    """Entscheidet, welche Ergebnisse einer Stufe in die nächste befördert werden."""
+
+    def __init__(self, eta=2, window=100, max_decisions=10000):
+        self.eta = eta
+        self.screened = 0
+        self.promoted = 0
+        self.max_decisions = max_decisions
+        # Gleitendes Fenster: Kandidaten werden im Lauf besser, die Schwelle wandert mit
+        self._scores = deque(maxlen=window)
+        # Bereits getroffene Entscheidungen je Schlüssel (älteste fliegen zuerst raus)
+        self._decisions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def threshold(self):
+        """Score, den ein Ergebnis mindestens braucht, um zu den besten 1/eta zu gehören."""
+        if len(self._scores) < self.eta:
+            return None
+        ranked = sorted(self._scores, reverse=True)
+        return ranked[math.ceil(len(ranked) / self.eta) - 1]
+
+    def should_promote(self, key, score):
+        with self._lock:
+            # Wiederholte Anfrage: gleiche Antwort, kein zweiter Fenster-Eintrag
+            if key in self._decisions:
+                return self._decisions[key]
+            threshold = self.threshold()
+            self._scores.append(score)
+            self.screened += 1
+            # Anlaufphase ohne genug Vergleichswerte: alles befördern
+            promote = threshold is None or score >= threshold
+            if promote:
+                self.promoted += 1
+            self._decisions[key] = promote
+            if len(self._decisions) > self.max_decisions:
+                self._decisions.popitem(last=False)
+        return promote
+
+    def stats(self):
+        with self._lock:
+            threshold = self.threshold()
+            return {
+                "cascade_screened": self.screened,
+                "cascade_promoted": self.promoted,
+                "cascade_promotion_rate": self.promoted / self.screened if self.screened else 0.0,
+                "cascade_threshold": threshold if threshold is not None else 0.0,
+            }
+
+
+class EvaluationPhase:
+    """GEPA-Callback: ob gerade ein Minibatch gesiebt wird und welcher Kandidat voll bewertet wird.
+
+    Minibatch-Bewertungen der Reflexion laufen mit Traces (Eltern, dann Kind); dazwischen
+    holt GEPA das Feedback für dieselben Stories. Nach der Kind-Bewertung folgt die
+    Valset-Bewertung. Merge-Kandidaten werden ohne Traces auf Valset-Beispielen gegen
+    volle Scores verglichen und laufen daher ebenfalls voll.
+    """
+
+    def __init__(self, screening_enabled=True):
+        self.screening_enabled = screening_enabled
+        self.screening = False
+        # Instruktionen des Kandidaten, der gerade ohne Traces bewertet wird (None = unbekannt)
+        self.candidate = None
+
+    def on_optimization_start(self, event):
+        self.candidate = event["seed_candidate"]
+
+    def on_iteration_start(self, event):
+        self.screening = False
+        self.candidate = None
+
+    def on_evaluation_start(self, event):
+        self.screening = self.screening_enabled and event["capture_traces"]
+        if not event["capture_traces"]:
+            # Merge-Stichprobe: Kandidat erst mit on_merge_attempted bekannt
+            self.candidate = None
+
+    def on_evaluation_end(self, event):
+        if event["candidate_idx"] is None:
+            # Kind-Kandidat fertig gesiebt, danach kommt höchstens die volle Valset-Bewertung
+            self.screening = False
+
+    def on_merge_attempted(self, event):
+        self.candidate = event["merged_candidate"]
+
+    def on_iteration_end(self, event):
+        self.screening = False
+        self.candidate = None
+
+
+class ScreenedAcceptance:
+    """GEPA-Akzeptanzkriterium: Ein Kind kommt nur aufs Valset, wenn es sein Screening überlebt."""
+
+    def __init__(self, rung, phase):
+        self.rung = rung
+        self.phase = phase
+
+    def _scores(self, proposal):
+        before = sum(proposal.subsample_scores_before or [])
+        after = proposal.subsample_scores_after or []
+        return before, sum(after), sum(after) / len(after) if after else 0.0
+
+    def should_accept(self, proposal, state):
+        before, after, mean = self._scores(proposal)
+        # Jedes gesiebte Kind zählt für die Schwelle, auch wenn es den Elternkandidaten nicht schlägt
+        promoted = self.rung.should_promote(candidate_key(proposal.candidate), mean)
+        accepted = after > before and promoted
+        if accepted:
+            self.phase.candidate = proposal.candidate
+        return accepted
+
+    def reject_reason(self, proposal, state):
+        before, after, mean = self._scores(proposal)
+        if after <= before:
+            return f"Screening-Score {after} nicht besser als {before} des Elternkandidaten"
+        return f"Screening-Score {mean:.2f} je Story nicht unter den besten 1/{self.rung.eta} (Schwelle {self.rung.threshold()})"
@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import time
+
+import mlflow
+
+# --- CHECKPOINTS FÜR GEPA-LÄUFE ---
+# GEPA schreibt seinen kompletten Zustand (Kandidaten-Pool, Val-Scores je Kandidat,
+# Reflexions-Historie, verbrauchtes Budget) nach jeder Iteration atomar nach
+# <run_dir>/gepa_state.bin und setzt beim nächsten Start im selben run_dir dort fort.
+# Hier liegt nur die Verwaltung drumherum: ein Verzeichnis pro Lauf, eine lesbare
+# checkpoint.json mit Fortschritt und MLflow-Run-ID sowie die MLflow-Tags.
+# Der Zähler von story_metric und der Bestwert werden bei jedem Metrik-Aufruf
+# in eine eigene kleine progress.json geschrieben (save_progress), damit ein
+# fortgesetzter Lauf weder MLflow-Steps noch versionierte best_prompt-Artefakte
+# überschreibt. checkpoint.json mit den wachsenden Score-Listen wird nur beim
+# Speichern des GEPA-Zustands neu geschrieben.
+CHECKPOINT_ROOT = os.environ.get("CHECKPOINT_DIR", "checkpoints")
+LATEST_FILE = os.path.join(CHECKPOINT_ROOT, "LATEST")
+META_FILE = "checkpoint.json"
+PROGRESS_FILE = "progress.json"
+# Stand von story_metric: eigener Zähler (GEPA zählt Feedback-Aufrufe nicht mit) und Bestwert
+PROGRESS_DEFAULTS = {"metric_step": 0, "best_score": -1.0, "best_prompt_version": 0}
+
+
+def write_text_atomic(path, text):
+    # Leser sehen immer entweder die alte oder die neue Datei, nie eine halb geschriebene
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_json_atomic(path, data):
+    write_text_atomic(path, json.dumps(data, indent=2, ensure_ascii=False))
+
+
+def new_run_dir():
+    run_dir = os.path.join(CHECKPOINT_ROOT, time.strftime("run_%Y%m%d_%H%M%S"))
+    os.makedirs(run_dir, exist_ok=True)
+    write_text_atomic(LATEST_FILE, run_dir)
+    return run_dir
+
+
+def resolve_run_dir(resume):
+    """'latest' oder ein konkretes Verzeichnis -> run_dir eines vorhandenen Checkpoints."""
+    if resume == "latest":
+        if not os.path.exists(LATEST_FILE):
+            raise FileNotFoundError(f"Kein Checkpoint vorhanden ({LATEST_FILE} fehlt).")
+        with open(LATEST_FILE, encoding="utf-8") as f:
+            resume = f.read().strip()
+    if not os.path.isdir(resume):
+        raise FileNotFoundError(f"Checkpoint-Verzeichnis {resume} existiert nicht.")
+    return resume
+
+
+def _load_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_meta(run_dir):
+    """checkpoint.json, ergänzt um den neueren Stand aus progress.json."""
+    meta = _load_json(os.path.join(run_dir, META_FILE))
+    meta.update(_load_json(os.path.join(run_dir, PROGRESS_FILE)))
+    return meta
+
+
+class CheckpointCallback:
+    """GEPA-Callback: hält checkpoint.json und die MLflow-Tags auf dem Stand des letzten gespeicherten Zustands."""
+
+    def __init__(self, run_dir, mlflow_run_id=None, meta=None):
+        self.run_dir = run_dir
+        self.mlflow_run_id = mlflow_run_id
+        meta = dict(meta or {})
+        self.progress = {key: meta.pop(key, default) for key, default in PROGRESS_DEFAULTS.items()}
+        self.meta = {
+            "run_dir": run_dir,
+            "mlflow_run_id": mlflow_run_id,
+            "iteration": 0,
+            "metric_calls_used": 0,
+            "val_scores": {},
+            "train_scores": [],
+            **meta,
+        }
+        # story_metric (GEPA-Threads, auch verwaiste Nachzügler) und die GEPA-Callbacks im
+        # Haupt-Thread greifen gleichzeitig auf meta und progress zu
+        self._lock = threading.Lock()
+        self._client = mlflow.MlflowClient() if mlflow_run_id else None
+
+    def on_budget_updated(self, event):
+        with self._lock:
+            self.meta["metric_calls_used"] = event["metric_calls_used"]
+
+    def on_valset_evaluated(self, event):
+        with self._lock:
+            self.meta["val_scores"][str(event["candidate_idx"])] = event["average_score"]
+
+    def on_evaluation_end(self, event):
+        with self._lock:
+            self.meta["train_scores"].append(
+                {"iteration": event["iteration"], "candidate_idx": event["candidate_idx"], "scores": event["scores"]}
+            )
+
+    def _write(self):
+        with self._lock:
+            self.meta["saved_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            write_json_atomic(os.path.join(self.run_dir, META_FILE), {**self.progress, **self.meta})
+
+    def save_progress(self, **progress):
+        with self._lock:
+            self.progress.update(progress, saved_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+            write_json_atomic(os.path.join(self.run_dir, PROGRESS_FILE), self.progress)
+
+    def on_state_saved(self, event):
+        with self._lock:
+            self.meta["iteration"] = event["iteration"]
+            metric_calls_used = self.meta["metric_calls_used"]
+        self._write()
+        if self._client is not None:
+            try:
+                self._client.set_tag(self.mlflow_run_id, "checkpoint_dir", self.run_dir)
+                self._client.set_tag(self.mlflow_run_id, "checkpoint_iteration", str(event["iteration"]))
+                self._client.set_tag(self.mlflow_run_id, "checkpoint_metric_calls", str(metric_calls_used))
+            except Exception as e:
+                print(f"Checkpoint-Tags nicht gesetzt: {e}")
@@ -0,0 +1,197 @@
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- LOKALER LLM-STAND-IN FÜR BENCHMARKS ---
+# Spricht die OpenAI-kompatible Chat-API (/v1/chat/completions, auch als Stream),
+# die Ollama unter /v1 ebenfalls anbietet. Antworten werden aus den Feldern des
+# DSPy-Prompts erzeugt: Stories aus den Gold-Examples, True für Judge-Felder,
+# eine neue Anweisung für GEPA-Reflexionen. Geantwortet wird im ChatAdapter-Format
+# ([[ ## feld ## ]]) oder als JSON, wenn der Prompt das verlangt (JSONAdapter,
+# z.B. GEPAs Instruction-Proposer). Latenz (Zeit bis zum
+# ersten Token, Tokens/Sekunde) und Fehlerrate sind konfigurierbar. Der Server
+# läuft in einem eigenen Prozess, damit er nicht mit dem Client um den GIL
+# konkurriert; Zähler gibt es unter /bench/stats.
+OUTPUT_FIELDS_RE = re.compile(r"Your output fields are:\n(.*?)\nAll interactions", re.S)
+FIELD_NAME_RE = re.compile(r"^\d+\. `(\w+)`", re.M)
+TOKEN_RE = re.compile(r"\S+\s*|\s+")
+JSON_OUTPUT_MARKER = "Outputs will be a JSON object"
+INSTRUCTION = "Schreibe eine ruhige, ausführliche Einschlafgeschichte auf Deutsch mit exakt 6 Absätzen."
+
+
+class FakeLLMServer:
+    def __init__(self, stories, port=0, ttft=0.05, tokens_per_sec=500.0, failure_rate=0.0, bad_story_rate=0.0, seed=0):
+        self.stories = stories
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.failure_rate = failure_rate
+        # Anteil Stories mit einem überzähligen 7. Absatz (prüft Regel-Checks und Streaming-Abbruch)
+        self.bad_story_rate = bad_story_rate
+        self.requests = 0
+        self.failures = 0
+        self.proposals = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._httpd.server_port}/v1"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _story(self):
+        with self._lock:
+            story = self._rng.choice(self.stories)
+            if self._rng.random() < self.bad_story_rate:
+                story = story + "\n\n" + story.split("\n\n")[1]
+        return story
+
+    def _instruction(self):
+        # Jeder Vorschlag unterscheidet sich, damit GEPA echte neue Kandidaten bekommt
+        with self._lock:
+            self.proposals += 1
+            return f"{INSTRUCTION} (Variante {self.proposals})"
+
+    def _value(self, field):
+        if field == "story":
+            return self._story()
+        if field in ("reasoning", "new_instruction"):
+            return self._instruction()
+        return True
+
+    def reply_for(self, messages, json_mode=False):
+        system = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+        match = OUTPUT_FIELDS_RE.search(system)
+        fields = FIELD_NAME_RE.findall(match.group(1)) if match else []
+        if not fields:
+            # Ohne erkennbare Signatur: reine Textantwort
+            return self._instruction()
+        values = {field: self._value(field) for field in fields}
+        if json_mode or JSON_OUTPUT_MARKER in system:
+            return json.dumps(values, ensure_ascii=False)
+        parts = [f"[[ ## {field} ## ]]\n{value}" for field, value in values.items()]
+        return "\n\n".join(parts) + "\n\n[[ ## completed ## ]]"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/bench/stats":
+                    self._send_json(200, {"requests": server.requests, "failures": server.failures, "proposals": server.proposals})
+                    return
+                # Ollama-Healthcheck ("/") und Modellliste
+                self._send_json(200, {"object": "list", "data": []})
+
+            def do_POST(self):
+                if self.path == "/bench/reset":
+                    with server._lock:
+                        server.requests = server.failures = server.proposals = 0
+                    self._send_json(200, {})
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    failed = server._rng.random() < server.failure_rate
+                    if failed:
+                        server.failures += 1
+                if failed:
+                    self._send_json(500, {"error": {"message": "simulierter Fehler", "type": "server_error"}})
+                    return
+                text = server.reply_for(body.get("messages", []), json_mode="response_format" in body)
+                tokens = TOKEN_RE.findall(text)
+                usage = {
+                    "prompt_tokens": sum(len(TOKEN_RE.findall(m.get("content") or "")) for m in body.get("messages", [])),
+                    "completion_tokens": len(tokens),
+                }
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                model = body.get("model", "fake")
+                if body.get("stream"):
+                    self._stream(model, tokens, usage)
+                else:
+                    time.sleep(server.ttft + len(tokens) / server.tokens_per_sec)
+                    self._send_json(200, {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+
+            def _send_json(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, model, tokens, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                def event(delta, finish_reason=None, **extra):
+                    chunk = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                        **extra,
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                try:
+                    time.sleep(server.ttft)
+                    for token in tokens:
+                        event({"content": token})
+                        time.sleep(1 / server.tokens_per_sec)
+                    event({}, finish_reason="stop", usage=usage)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client hat abgebrochen (Streaming-Abbruch)
+                    pass
+
+        return Handler
+
+
+def _serve(ready, stories, options):
+    server = FakeLLMServer(stories, **options)
+    ready.set()
+    server._httpd.serve_forever()
+
+
+def start_server_process(stories, port, **options):
+    """Startet den Fake-Server in einem eigenen Prozess und wartet, bis er lauscht."""
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Event()
+    process = ctx.Process(target=_serve, args=(ready, stories, {"port": port, **options}), daemon=True)
+    process.start()
+    if not ready.wait(30):
+        process.terminate()
+        raise RuntimeError("Fake-LLM-Server ist nicht gestartet.")
+    return process
@@ -0,0 +1,262 @@
+import functools
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import dspy
+import litellm
+
+from lm_profiler import LMCall
+from streaming import stream_with_guard
+
+# --- PERSISTENTER LLM-CACHE ---
+# Antworten von Ollama werden content-adressiert in SQLite abgelegt (im gemounteten
+# /app Volume), damit ein neu gestarteter Lauf bereits bezahlte Aufrufe sofort
+# wiederverwenden kann. Geteilt von execution_lm und reflection_lm.
+IGNORED_KEY_ARGS = ("api_key", "api_base", "base_url")
+
+
+def request_key(namespace="", **parts):
+    payload = json.dumps({"namespace": namespace, **parts}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path, max_entries=5000, namespace=""):
+        self.path = path
+        self.max_entries = max_entries
+        # Fließt in jeden Schlüssel ein (z.B. STORY_CONSTRAINTS), damit Regeländerungen den Cache invalidieren
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    def make_key(self, **parts):
+        return request_key(self.namespace, **parts)
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, last_used) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+            # LRU: älteste Einträge über dem Limit verwerfen
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": self.hits / total if total else 0.0,
+            "cache_entries": size,
+        }
+
+
+# Vorübergehende Fehler, die CachedLM selbst wiederholt (statt dspy/litellm), damit Retries zählbar sind
+RETRYABLE_ERRORS = (
+    litellm.Timeout,
+    litellm.APIConnectionError,
+    litellm.InternalServerError,
+    litellm.RateLimitError,
+    litellm.ServiceUnavailableError,
+)
+TIMEOUT_ERRORS = (litellm.Timeout,)
+try:
+    # Neuere dspy-Versionen übersetzen Provider-Fehler in eigene Typen
+    from dspy.utils.exceptions import LMTimeoutError, is_retryable_lm_error
+
+    TIMEOUT_ERRORS += (LMTimeoutError,)
+except ImportError:
+    def is_retryable_lm_error(error):
+        return False
+
+# Usage der letzten nicht gestreamten Antwort im aktuellen Thread (aus dem History-Eintrag von dspy)
+_last_usage = threading.local()
+
+
+def _is_retryable(error):
+    return isinstance(error, RETRYABLE_ERRORS) or is_retryable_lm_error(error)
+
+
+class _InFlight:
+    """Ergebnis eines laufenden Aufrufs, auf das identische Aufrufe warten."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.outputs = None
+        self.error = None
+
+
+class CachedLM(dspy.LM):
+    """dspy.LM, das vor jedem Aufruf im ResponseCache nachschlägt.
+
+    Gecacht wird auf Ebene von __call__, damit Predictor-Traces (die GEPA für die
+    Reflexion braucht) unverändert entstehen. Echte Aufrufe laufen optional über
+    einen AdaptiveLimiter (scheduler.py), Cache-Treffer belegen keinen Slot.
+    Wird per Predictor-Config ein stream_guard übergeben, wird gestreamt und
+    bei Regelverstoß früh abgebrochen (streaming.py). Mit einem LMProfiler
+    (lm_profiler.py) wird jeder Aufruf unter der Rolle role aufgezeichnet.
+
+    Identische Aufrufe, die gleichzeitig laufen, gehen nur einmal an Ollama
+    (Single-Flight): dspys ParallelExecutor reicht Aufgaben, die länger als
+    120 s in der Limiter-Warteschlange hängen, als Nachzügler erneut ein. Das
+    Duplikat wartet auf das Ergebnis des Originals, statt selbst zu generieren.
+    """
+
+    def __init__(self, *args, response_cache=None, limiter=None, profiler=None, role=None, num_retries=3, **kwargs):
+        # Retries übernimmt _call_model, damit jeder Versuch durch den Limiter läuft und gezählt wird
+        super().__init__(*args, num_retries=0, **kwargs)
+        self.response_cache = response_cache
+        self.limiter = limiter
+        self.profiler = profiler
+        self.role = role
+        self.max_retries = num_retries
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    def update_history(self, entry):
+        _last_usage.value = entry.get("usage")
+        super().update_history(entry)
+
+    def _stream_model(self, prompt, messages, stream_guard, stats, **kwargs):
+        messages = messages or [{"role": "user", "content": prompt}]
+        text, reason, info = stream_with_guard(self.model, messages, stream_guard, **{**self.kwargs, **kwargs})
+        stats.update(info)
+        if reason:
+            print(f" >>> Generierung abgebrochen: {reason}")
+        return [text]
+
+    def _plain_model(self, prompt, messages, stats, **kwargs):
+        _last_usage.value = None
+        outputs = super().__call__(prompt=prompt, messages=messages, **kwargs)
+        usage = _last_usage.value or {}
+        stats["prompt_tokens"] = usage.get("prompt_tokens")
+        stats["completion_tokens"] = usage.get("completion_tokens")
+        return outputs
+
+    def _call_model(self, prompt, messages, stream_guard=None, stats=None, **kwargs):
+        stats = {} if stats is None else stats
+        call = functools.partial(self._plain_model, stats=stats)
+        if stream_guard is not None:
+            call = functools.partial(self._stream_model, stream_guard=stream_guard, stats=stats)
+        if self.limiter is not None:
+            call = functools.partial(self.limiter.run, call)
+        for attempt in range(self.max_retries + 1):
+            attempt_start = time.monotonic()
+            try:
+                outputs = call(prompt=prompt, messages=messages, **kwargs)
+            except Exception as e:
+                if isinstance(e, TIMEOUT_ERRORS):
+                    stats["timeouts"] = stats.get("timeouts", 0) + 1
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                stats["retries"] = attempt + 1
+                time.sleep(min(2 ** attempt, 60))
+                continue
+            stats["generation_s"] = time.monotonic() - attempt_start
+            return outputs
+
+    def _record(self, start, stats, cached=False, failed=False):
+        if self.profiler is None:
+            return
+        self.profiler.record(LMCall(
+            role=self.profiler.current_role(self.role or "student"),
+            model=self.model,
+            iteration=self.profiler.iteration,
+            latency=time.monotonic() - start,
+            generation_s=stats.get("generation_s", 0.0),
+            ttft=stats.get("ttft"),
+            prompt_tokens=stats.get("prompt_tokens"),
+            completion_tokens=stats.get("completion_tokens"),
+            retries=stats.get("retries", 0),
+            timeouts=stats.get("timeouts", 0),
+            cached=cached,
+            failed=failed,
+        ))
+
+    def _profiled_call(self, prompt, messages, stream_guard, **kwargs):
+        start = time.monotonic()
+        stats = {}
+        try:
+            outputs = self._call_model(prompt, messages, stream_guard, stats, **kwargs)
+        except Exception:
+            self._record(start, stats, failed=True)
+            raise
+        self._record(start, stats)
+        return outputs
+
+    def __call__(self, prompt=None, messages=None, **kwargs):
+        stream_guard = kwargs.pop("stream_guard", None)
+        lm_kwargs = {k: v for k, v in {**self.kwargs, **kwargs}.items() if k not in IGNORED_KEY_ARGS}
+        if stream_guard is not None:
+            # Abgebrochene Antworten hängen von den Guard-Regeln ab
+            lm_kwargs["stream_guard"] = stream_guard.name
+        parts = {"model": self.model, "lm_kwargs": lm_kwargs, "prompt": prompt, "messages": messages}
+        if self.response_cache is None:
+            key = request_key(**parts)
+        else:
+            key = self.response_cache.make_key(**parts)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                self._record(time.monotonic(), {}, cached=True)
+                return cached
+
+        with self._in_flight_lock:
+            flight = self._in_flight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._in_flight[key] = _InFlight()
+        if not owner:
+            start = time.monotonic()
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            # Kein eigener Aufruf, im Profil wie ein Cache-Treffer
+            self._record(start, {}, cached=True)
+            return flight.outputs
+
+        try:
+            flight.outputs = self._profiled_call(prompt, messages, stream_guard, **kwargs)
+            if self.response_cache is not None:
+                # Vor dem Austragen cachen, damit kein später Aufruf in die Lücke fällt
+                try:
+                    self.response_cache.put(key, flight.outputs)
+                except TypeError:
+                    # Nicht serialisierbare Antworten (z.B. Tool-Calls) werden nicht gecacht
+                    pass
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+            flight.done.set()
+        return flight.outputs
@@ -0,0 +1,176 @@
+import contextlib
+import contextvars
+import math
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass
+
+# --- PROFILING ALLER LM-AUFRUFE ---
+# Jeder Aufruf über CachedLM landet hier als LMCall: Tokens, Zeit bis zum ersten
+# Token (nur gestreamt messbar), Gesamtlatenz inkl. Retries, Tokens/Sekunde,
+# Retries und Timeouts, getaggt mit Rolle (student, screen, judge, reflector) und
+# GEPA-Iteration. Daraus entstehen drei Sichten: Metriken pro Aufruf und pro
+# Iteration (MLflow), eine Aufschlüsselung pro Metrik-Aufruf (take_breakdown)
+# und eine Zusammenfassung je Rolle und Modell am Ende des Laufs.
+ROLES = ("student", "screen", "judge", "reflector")
+
+# Rolle des aktuellen Aufrufs; überschreibt die Standardrolle des LMs (reflection_lm ist Judge und Reflektor)
+_current_role = contextvars.ContextVar("lm_role", default=None)
+
+
+@dataclass
+class LMCall:
+    role: str
+    model: str
+    iteration: int
+    latency: float
+    generation_s: float = 0.0
+    ttft: float = None
+    prompt_tokens: int = None
+    completion_tokens: int = None
+    retries: int = 0
+    timeouts: int = 0
+    cached: bool = False
+    failed: bool = False
+
+    @property
+    def tokens_per_sec(self):
+        # Durchsatz des erfolgreichen Versuchs, ohne Backoff-Wartezeiten
+        if self.cached or not self.completion_tokens or self.generation_s <= 0:
+            return None
+        return self.completion_tokens / self.generation_s
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, math.ceil(q * len(values)) - 1)]
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+
+class LMProfiler:
+    def __init__(self, max_records=100000):
+        # Wird von GEPA-Callbacks gesetzt (0 = vor der ersten Iteration bzw. außerhalb von GEPA)
+        self.iteration = 0
+        # Optionaler MlflowSink für Metriken pro Aufruf und pro Iteration
+        self.sink = None
+        # Tokens aller echten (nicht gecachten) Aufrufe, für das Token-Budget (budget.py)
+        self.total_tokens = 0
+        self._records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self._steps = defaultdict(int)
+        self._iteration_totals = defaultdict(lambda: defaultdict(float))
+        # Summen seit dem letzten take_breakdown, je Thread (Student und Judge laufen im Metrik-Thread)
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def role(self, name):
+        token = _current_role.set(name)
+        try:
+            yield
+        finally:
+            _current_role.reset(token)
+
+    def current_role(self, default):
+        return _current_role.get() or default
+
+    def record(self, call):
+        with self._lock:
+            self._records.append(call)
+            if not call.cached:
+                self.total_tokens += (call.prompt_tokens or 0) + (call.completion_tokens or 0)
+            self._steps[call.role] += 1
+            step = self._steps[call.role]
+            totals = self._iteration_totals[call.iteration]
+            totals[f"{call.role}_latency_s"] += call.latency
+            totals[f"{call.role}_calls"] += 1
+            totals[f"{call.role}_completion_tokens"] += call.completion_tokens or 0
+
+        pending = getattr(self._local, "pending", None)
+        if pending is None:
+            pending = self._local.pending = defaultdict(float)
+        pending[f"{call.role}_calls"] += 1
+        pending[f"{call.role}_latency_s"] += call.latency
+        pending[f"{call.role}_prompt_tokens"] += call.prompt_tokens or 0
+        pending[f"{call.role}_completion_tokens"] += call.completion_tokens or 0
+        pending[f"{call.role}_retries"] += call.retries
+
+        if self.sink is not None and not call.cached:
+            metrics = {f"lm_{call.role}_latency_s": call.latency, f"lm_{call.role}_retries": call.retries}
+            for key in ("ttft", "tokens_per_sec", "prompt_tokens", "completion_tokens"):
+                value = getattr(call, key)
+                if value is not None:
+                    metrics[f"lm_{call.role}_{key}"] = value
+            self.sink.log_metrics(metrics, step=step)
+
+    def take_breakdown(self):
+        """Summen je Rolle, die im aktuellen Thread seit dem letzten Aufruf angefallen sind."""
+        pending = getattr(self._local, "pending", None) or {}
+        self._local.pending = defaultdict(float)
+        return dict(pending)
+
+    def summary(self):
+        """Eine Zeile je (Rolle, Modell) über alle aufgezeichneten Aufrufe."""
+        with self._lock:
+            records = list(self._records)
+        groups = defaultdict(list)
+        for call in records:
+            groups[(call.role, call.model)].append(call)
+
+        rows = []
+        for (role, model), calls in sorted(groups.items(), key=lambda item: (ROLES + (item[0][0],)).index(item[0][0])):
+            live = [c for c in calls if not c.cached and not c.failed]
+            latencies = [c.latency for c in live]
+            ttfts = [c.ttft for c in live if c.ttft is not None]
+            completion = sum(c.completion_tokens or 0 for c in live)
+            generation = sum(c.generation_s for c in live if c.completion_tokens)
+            rows.append({
+                "role": role,
+                "model": model,
+                "calls": len(calls),
+                "cached": sum(c.cached for c in calls),
+                "failed": sum(c.failed for c in calls),
+                "retries": sum(c.retries for c in calls),
+                "timeouts": sum(c.timeouts for c in calls),
+                "total_s": round(sum(c.latency for c in calls), 1),
+                "latency_mean_s": round(_mean(latencies), 2) if latencies else None,
+                "latency_p95_s": round(_percentile(latencies, 0.95), 2) if latencies else None,
+                "ttft_mean_s": round(_mean(ttfts), 2) if ttfts else None,
+                "prompt_tokens": sum(c.prompt_tokens or 0 for c in live),
+                "completion_tokens": completion,
+                "tokens_per_sec": round(completion / generation, 1) if generation else None,
+            })
+        return rows
+
+    def format_table(self, rows=None):
+        rows = self.summary() if rows is None else rows
+        if not rows:
+            return "Keine LM-Aufrufe aufgezeichnet."
+        columns = list(rows[0])
+        cells = [[("-" if row[c] is None else str(row[c])) for c in columns] for row in rows]
+        widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+        lines = [" | ".join(c.ljust(w) for c, w in zip(columns, widths)), "-+-".join("-" * w for w in widths)]
+        lines += [" | ".join(v.ljust(w) for v, w in zip(r, widths)) for r in cells]
+        return "\n".join(lines)
+
+    def summary_metrics(self, rows=None):
+        """Zusammenfassung als flache MLflow-Metriken (lm_<rolle>_<kennzahl>, eine Rolle = ein Modell)."""
+        rows = self.summary() if rows is None else rows
+        metrics = {}
+        for row in rows:
+            for key, value in row.items():
+                if key not in ("role", "model") and value is not None:
+                    metrics[f"lm_{row['role']}_{key}"] = value
+        return metrics
+
+    # GEPA-Callbacks: Iteration für das Tagging und Summen pro Iteration nach MLflow
+    def on_iteration_start(self, event):
+        self.iteration = event["iteration"]
+
+    def on_iteration_end(self, event):
+        with self._lock:
+            totals = dict(self._iteration_totals.get(event["iteration"], {}))
+        if self.sink is not None and totals:
+            self.sink.log_metrics({f"iteration_{key}": value for key, value in totals.items()}, step=event["iteration"])
@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+
+import mlflow
+from mlflow.entities import Metric
+
+# --- NICHT-BLOCKIERENDES MLFLOW-LOGGING ---
+# story_metric liegt auf dem heißen Pfad. Statt pro Aufruf synchron per HTTP an
+# den Tracking-Server (Postgres + MinIO) zu loggen, landen Metriken und Artefakte
+# in einem begrenzten Puffer, den ein Hintergrund-Thread per log_batch leert.
+# Ist der Puffer voll, wartet der Aufrufer (Backpressure). Ist MLflow nicht
+# erreichbar, bleiben die Daten (begrenzt) liegen und werden später erneut gesendet.
+MAX_BATCH_METRICS = 1000
+
+
+class MlflowSink:
+    def __init__(self, run_id, max_buffer=10000, flush_interval=5.0, max_pending=50000):
+        self.run_id = run_id
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # Verworfene Metrik-Punkte bzw. Artefakte (Puffer übergelaufen oder beim Schließen nicht gesendet)
+        self.dropped = 0
+        self.dropped_texts = 0
+        self._failing = False
+        self._queue = queue.Queue(maxsize=max_buffer)
+        self._pending_metrics = []
+        self._pending_texts = []
+        self._client = mlflow.MlflowClient()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mlflow-sink", daemon=True)
+        self._thread.start()
+
+    def log_metrics(self, metrics, step=None):
+        timestamp = int(time.time() * 1000)
+        for key, value in metrics.items():
+            self._queue.put(Metric(key, float(value), timestamp, step or 0))
+
+    def log_text(self, text, artifact_file):
+        self._queue.put((text, artifact_file))
+
+    def close(self, timeout=30.0):
+        self._stop.set()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            # Nach dem Join eingereihte Reste im aufrufenden Thread senden
+            self._drain()
+            self._flush()
+            abandoned = len(self._pending_metrics)
+            abandoned_texts = len(self._pending_texts)
+        else:
+            # Thread hängt noch in MLflows HTTP-Retries: alles Ungesendete gilt als verloren.
+            # Die Queue enthält Metriken und Artefakte gemischt, daher getrennt zählen.
+            abandoned = len(self._pending_metrics)
+            abandoned_texts = len(self._pending_texts)
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, Metric):
+                    abandoned += 1
+                else:
+                    abandoned_texts += 1
+        self.dropped += abandoned
+        self.dropped_texts += abandoned_texts
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._stop.wait(self.flush_interval)
+            self._drain()
+            self._flush()
+
+    def _drain(self):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, Metric):
+                self._pending_metrics.append(item)
+            else:
+                self._pending_texts.append(item)
+        overflow = len(self._pending_metrics) - self.max_pending
+        if overflow > 0:
+            # MLflow zu lange weg: älteste Punkte verwerfen, statt den Speicher zu sprengen
+            del self._pending_metrics[:overflow]
+            self.dropped += overflow
+
+    def _flush(self):
+        try:
+            while self._pending_metrics:
+                batch = self._pending_metrics[:MAX_BATCH_METRICS]
+                self._client.log_batch(self.run_id, metrics=batch, synchronous=True)
+                del self._pending_metrics[:len(batch)]
+            while self._pending_texts:
+                text, artifact_file = self._pending_texts[0]
+                self._client.log_text(self.run_id, text, artifact_file)
+                self._pending_texts.pop(0)
+        except Exception as e:
+            if not self._failing:
+                print(f"MLflow nicht erreichbar, Metriken werden gepuffert: {e}")
+            self._failing = True
+        else:
+            if self._failing:
+                print("MLflow wieder erreichbar, Puffer geleert.")
+            self._failing = False
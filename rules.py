@@ -0,0 +1,151 @@
+import re
+from dataclasses import dataclass, field
+
+# --- DETERMINISTISCHE REGEL-CHECKS ---
+# Die Nummern entsprechen STORY_CONSTRAINTS in app.py. Alles, was sich mechanisch
+# prüfen lässt, wird hier lokal entschieden; der LLM-Judge bekommt nur noch die
+# semantischen Regeln vorgelegt.
+RULE_LANGUAGE = 0
+RULE_HEADER = 1
+RULE_PARAGRAPHS = 2
+RULE_LENGTH = 3
+RULE_QUESTION_END = 7
+RULE_ONLY_STORY = 8
+
+MECHANICAL_RULES = (RULE_LANGUAGE, RULE_HEADER, RULE_PARAGRAPHS, RULE_LENGTH, RULE_QUESTION_END, RULE_ONLY_STORY)
+SEMANTIC_RULES = (4, 5, 6, 9, 10)
+TOTAL_RULES = len(MECHANICAL_RULES) + len(SEMANTIC_RULES)
+
+# Bei diesen Verstößen lohnt sich kein Judge-Aufruf mehr
+HARD_GATES = (RULE_LANGUAGE, RULE_HEADER)
+HARD_MIN_WORDS = 400
+
+TARGET_PARAGRAPHS = 6
+MIN_WORDS = 600
+MAX_WORDS = 800
+# Ab hier fällt der Wort-Score in story_metric ab, Streaming bricht dann ab
+ABORT_MAX_WORDS = 850
+
+WORD_RE = re.compile(r"\w+")
+HEADER_RE = re.compile(r"^### \S")
+PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+ABORT_RE = re.compile(r"\s*\[ABBRUCH: (.*?)\]\s*$")
+# Typische Vor- und Nachworte des Modells. Nur ganze Phrasen, denn einzelne Wörter
+# wie "gerne" oder "natürlich" kommen auch in gültigen Titeln vor ("### Natürlich! Ich träume …").
+PREAMBLE_RE = re.compile(
+    r"\bhier (ist|sind|kommt) (\w+ ){0,3}\w*geschichte"
+    r"|\b(gerne|natürlich|klar|sicher)\s*[,!]\s*(hier (ist|sind|kommt)\b|gerne?\s*[,.!:]|ich (schreibe|erzähle|erfinde) (dir|euch|ihnen)\b)"
+    r"|\bich hoffe,? (dir|euch|ihnen|die geschichte)\b"
+    r"|\bviel spaß (beim|mit)\b"
+    r"|\bhere(\s+is|'s) (your|the|a)\b"
+    r"|\b(sure|of course)\s*[,!]"
+    r"|\bi hope (you|this)\b",
+    re.IGNORECASE,
+)
+
+# Häufige Funktionswörter für eine einfache Spracherkennung
+GERMAN_WORDS = frozenset(
+    "und der die das ist nicht sie ein eine einen zu den mit sich auf im dem es war ihre ihr "
+    "als auch wie noch nach bei aus wenn dass wir ich du er sein sind hatten wurde".split()
+)
+ENGLISH_WORDS = frozenset(
+    "the and is of to was it with they their that this for are were have had he she you not".split()
+)
+
+
+@dataclass
+class RuleReport:
+    passed: dict = field(default_factory=dict)
+    words: int = 0
+    paragraphs: int = 0
+
+    @property
+    def passed_count(self):
+        return sum(1 for ok in self.passed.values() if ok)
+
+    @property
+    def hard_fail(self):
+        return self.words < HARD_MIN_WORDS or not all(self.passed.get(rule, False) for rule in HARD_GATES)
+
+    @property
+    def failed(self):
+        return [rule for rule, ok in sorted(self.passed.items()) if not ok]
+
+
+def count_words(text):
+    return len(WORD_RE.findall(text))
+
+
+def split_story(text):
+    """Liefert (Header-Zeile, Absätze) ohne leere oder sehr kurze Blöcke."""
+    stripped = text.strip()
+    header, _, body = stripped.partition("\n")
+    if not HEADER_RE.match(header):
+        header, body = "", stripped
+    paragraphs = [p for p in PARAGRAPH_SPLIT_RE.split(body) if len(p.strip()) > 30]
+    return header, paragraphs
+
+
+def is_german(text):
+    tokens = [t.lower() for t in WORD_RE.findall(text)]
+    if not tokens:
+        return False
+    de_hits = sum(1 for t in tokens if t in GERMAN_WORDS)
+    en_hits = sum(1 for t in tokens if t in ENGLISH_WORDS)
+    return de_hits >= 2 * en_hits and de_hits / len(tokens) >= 0.05
+
+
+def has_only_story(text):
+    stripped = text.strip()
+    if not stripped.startswith("###"):
+        return False
+    # Vor- und Nachworte des Modells: Titelzeile oder ein kurzer letzter Block
+    blocks = PARAGRAPH_SPLIT_RE.split(stripped)
+    first_line = blocks[0].split("\n", 1)[0]
+    tail = blocks[-1] if len(blocks) > 1 and len(blocks[-1]) < 200 else ""
+    return not (PREAMBLE_RE.search(first_line) or PREAMBLE_RE.search(tail))
+
+
+def check_story(text):
+    text = str(text or "")
+    header, paragraphs = split_story(text)
+    words = count_words(text)
+    report = RuleReport(words=words, paragraphs=len(paragraphs))
+    report.passed = {
+        RULE_LANGUAGE: is_german(text),
+        RULE_HEADER: bool(header),
+        RULE_PARAGRAPHS: len(paragraphs) == TARGET_PARAGRAPHS,
+        RULE_LENGTH: MIN_WORDS <= words <= MAX_WORDS,
+        RULE_QUESTION_END: text.rstrip().endswith("?"),
+        RULE_ONLY_STORY: has_only_story(text),
+    }
+    return report
+
+
+# --- INKREMENTELLE CHECKS (STREAMING) ---
+def stream_abort_reason(story):
+    """Prüft eine noch laufende Generierung; liefert den Abbruchgrund oder None."""
+    stripped = story.lstrip()
+    if len(stripped) >= 4 and not stripped.startswith("### "):
+        return "Die erste Zeile beginnt nicht mit '### ' (Regel 1/8)."
+    first_line, complete, _ = stripped.partition("\n")
+    if complete and PREAMBLE_RE.search(first_line):
+        return "Die Titelzeile enthält ein Vorwort/Kommentar statt nur der Story (Regel 8)."
+    if count_words(story) > ABORT_MAX_WORDS:
+        return f"Mehr als {ABORT_MAX_WORDS} Wörter (Regel 3)."
+    _, paragraphs = split_story(story)
+    if len(paragraphs) > TARGET_PARAGRAPHS:
+        return f"Ein {len(paragraphs)}. Absatz wurde begonnen, erlaubt sind exakt {TARGET_PARAGRAPHS} (Regel 2)."
+    return None
+
+
+def mark_aborted(story, reason):
+    return f"{story.rstrip()}\n\n[ABBRUCH: {reason}]"
+
+
+def split_aborted(story):
+    """Trennt einen Abbruch-Vermerk ab: (story, grund) bzw. (story, None)."""
+    match = ABORT_RE.search(story)
+    if match is None:
+        return story, None
+    return story[:match.start()], match.group(1)
@@ -0,0 +1,73 @@
+import math
+import threading
+import time
+
+# --- ADAPTIVE NEBENLÄUFIGKEIT PRO MODELL ---
+# GEPA wertet Beispiele parallel aus (num_threads). Damit Ollama dabei nicht so
+# überlastet wird, dass litellm.request_timeout greift, bekommt jedes LM einen
+# eigenen begrenzten Pool. Wartende Threads hängen lokal in der Warteschlange,
+# nicht im HTTP-Request. Das Limit folgt der gemessenen Latenz (Gradient-Verfahren):
+# steigt die Latenz gegenüber dem besten beobachteten Wert, sinkt das Limit;
+# bleibt sie stabil und stauen sich Aufrufe, wächst es.
+
+
+class AdaptiveLimiter:
+    def __init__(self, name, initial=1, minimum=1, maximum=4, timeout=None, smoothing=0.3):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        # Aufrufe, die diesem Wert nahekommen, gelten als Überlast
+        self.timeout = timeout
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.latency_ewma = None
+        self.min_latency = None
+        self._cond = threading.Condition()
+
+    def run(self, fn, *args, **kwargs):
+        with self._cond:
+            self.waiting += 1
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.waiting -= 1
+            self.in_flight += 1
+        start = time.monotonic()
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(time.monotonic() - start, failed)
+
+    def _record(self, latency, failed):
+        with self._cond:
+            self.in_flight -= 1
+            self.completed += 1
+            if failed or (self.timeout and latency > 0.5 * self.timeout):
+                # Fehler oder knapp am Timeout: Last sofort halbieren
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                ewma = latency if self.latency_ewma is None else (
+                    self.smoothing * latency + (1 - self.smoothing) * self.latency_ewma
+                )
+                self.latency_ewma = ewma
+                # Minimum driftet langsam nach oben, damit ein einzelner kurzer Aufruf das Limit nicht dauerhaft drückt
+                self.min_latency = ewma if self.min_latency is None else min(ewma, self.min_latency * 1.02)
+                gradient = max(0.5, min(1.0, self.min_latency / ewma))
+                headroom = math.sqrt(self.limit) if self.waiting else 0.0
+                self.limit = max(self.minimum, min(self.maximum, self.limit * gradient + headroom))
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                f"{self.name}_limit": self.limit,
+                f"{self.name}_in_flight": self.in_flight,
+                f"{self.name}_queue_depth": self.waiting,
+                f"{self.name}_latency_ewma": self.latency_ewma or 0.0,
+            }
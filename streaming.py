@@ -0,0 +1,107 @@
+import time
+
+import litellm
+
+# --- STREAMING MIT FRÜHEM ABBRUCH ---
+# Statt auf die komplette Antwort (bis zu max_tokens) zu warten, werden die Tokens
+# von Ollama gestreamt und laufend geprüft. Sobald die Ausgabe nicht mehr gut
+# abschneiden kann, wird der Request geschlossen (Ollama bricht die Generierung
+# dann ab) und eine gekürzte Antwort im ChatAdapter-Format zurückgegeben, damit
+# der Predictor-Trace für GEPA ganz normal entsteht.
+
+
+class FieldStreamGuard:
+    """Prüft ein einzelnes Ausgabefeld (ChatAdapter-Format) während des Streamings.
+
+    check(feldtext) liefert einen Abbruchgrund oder None, mark(feldtext, grund)
+    erzeugt den gekürzten Feldinhalt inklusive Abbruch-Vermerk.
+    """
+
+    def __init__(self, field, check, mark, check_every=20):
+        self.field = field
+        self.check = check
+        self.mark = mark
+        # Prüfung bei jedem Zeilenumbruch, sonst nur alle n Chunks
+        self.check_every = check_every
+        self.header = f"[[ ## {field} ## ]]"
+
+    @property
+    def name(self):
+        return f"{self.field}:{self.check.__name__}"
+
+    def field_text(self, text):
+        _, found, rest = text.partition(self.header)
+        if not found:
+            return None
+        return rest.split("[[ ##", 1)[0].lstrip("\n")
+
+    def abort_reason(self, text):
+        value = self.field_text(text)
+        return None if value is None else self.check(value)
+
+    def abort_output(self, text, reason):
+        value = self.field_text(text) or ""
+        return f"{self.header}\n{self.mark(value, reason)}\n\n[[ ## completed ## ]]"
+
+
+def _close_stream(response):
+    stream = getattr(response, "completion_stream", None)
+    close = getattr(stream, "close", None) or getattr(response, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
+
+
+def stream_with_guard(model, messages, guard, **request):
+    """Streamt eine Completion und bricht ab, sobald guard einen Grund meldet.
+
+    Gibt (text, abbruchgrund, info) zurück; abbruchgrund ist None bei vollständiger
+    Antwort, info enthält ttft sowie prompt_tokens/completion_tokens fürs Profiling.
+    """
+    # rollout_id unterscheidet nur Cache-Einträge und geht nicht an den Server (wie in dspy.LM)
+    request.pop("rollout_id", None)
+    start = time.monotonic()
+    response = litellm.completion(
+        model=model,
+        messages=messages,
+        stream=True,
+        # Token-Zahlen im letzten Chunk; Provider ohne stream_options ignorieren das
+        stream_options={"include_usage": True},
+        drop_params=True,
+        # Retries übernimmt der Aufrufer (CachedLM), damit sie gezählt werden
+        num_retries=0,
+        max_retries=0,
+        **request,
+    )
+    info = {"ttft": None, "prompt_tokens": None, "completion_tokens": None}
+    text = ""
+    chunks = 0
+    since_check = 0
+    try:
+        for chunk in response:
+            usage = getattr(chunk, "usage", None)
+            if usage:
+                info["prompt_tokens"] = usage.prompt_tokens
+                info["completion_tokens"] = usage.completion_tokens
+            delta = (chunk.choices[0].delta.content or "") if chunk.choices else ""
+            if not delta:
+                continue
+            if info["ttft"] is None:
+                info["ttft"] = time.monotonic() - start
+            text += delta
+            chunks += 1
+            since_check += 1
+            if "\n" in delta or since_check >= guard.check_every:
+                since_check = 0
+                reason = guard.abort_reason(text)
+                if reason:
+                    # Abgebrochen kommt kein Usage-Chunk mehr: ein Chunk entspricht etwa einem Token
+                    info["completion_tokens"] = chunks
+                    return guard.abort_output(text, reason), reason, info
+    finally:
+        _close_stream(response)
+    if info["completion_tokens"] is None:
+        info["completion_tokens"] = chunks
+    return text, None, info
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# Module liegen flach neben app.py (wie in /app im Container)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py liest die Modelle beim Import aus der Umgebung; für die Tests wird kein LM aufgerufen
+os.environ.setdefault("OLLAMA_URL", "http://localhost:11434")
+os.environ.setdefault("EXECUTION_LLM", "ollama/llama3.1:8b")
+os.environ.setdefault("REFLECTION_LLM", "ollama/llama3.1:8b")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+# Kein Cache-File und kein Vorab-Judge aus der .env übernehmen
+os.environ["LLM_CACHE"] = "0"
+os.environ["SCREEN_LLM"] = ""
+
+
+@pytest.fixture(scope="session")
+def gold_stories():
+    import app
+
+    return [example.story for example in app.all_examples]
@@ -0,0 +1,140 @@
+from types import SimpleNamespace
+
+from cascade import EvaluationPhase, PromotionRung, ScreenedAcceptance, candidate_key
+
+
+def proposal(before, after, instructions="Schreibe eine Geschichte."):
+    return SimpleNamespace(
+        candidate={"predict": instructions},
+        subsample_scores_before=before,
+        subsample_scores_after=after,
+    )
+
+
+# --- PROMOTION ---
+def test_warm_up_promotes_everything():
+    rung = PromotionRung(eta=3)
+    assert rung.threshold() is None
+    assert rung.should_promote("a", 0.1)
+    assert rung.should_promote("b", 0.0)
+    assert rung.should_promote("c", 0.2)
+    assert rung.threshold() is not None
+
+
+def test_only_top_fraction_is_promoted():
+    rung = PromotionRung(eta=2)
+    for key, score in [("a", 0.2), ("b", 0.4), ("c", 0.6), ("d", 0.8)]:
+        rung.should_promote(key, score)
+    # Beste Hälfte von [0.8, 0.6, 0.4, 0.2]: Schwelle 0.6
+    assert rung.threshold() == 0.6
+    assert rung.should_promote("e", 0.6)
+    assert not rung.should_promote("f", 0.5)
+
+
+def test_repeated_key_returns_same_decision():
+    rung = PromotionRung(eta=2)
+    rung.should_promote("a", 0.9)
+    rung.should_promote("b", 0.8)
+    assert not rung.should_promote("c", 0.1)
+    screened = rung.screened
+    # GEPA fragt das Kriterium mehrfach: kein zweiter Fenster-Eintrag, keine neue Entscheidung
+    assert not rung.should_promote("c", 0.99)
+    assert rung.screened == screened
+    assert len(rung._scores) == 3
+
+
+def test_window_follows_recent_scores():
+    rung = PromotionRung(eta=2, window=2)
+    for key, score in [("a", 0.9), ("b", 0.9), ("c", 0.1), ("d", 0.1)]:
+        rung.should_promote(key, score)
+    # Die frühen 0.9er sind aus dem Fenster gefallen
+    assert rung.threshold() == 0.1
+    assert rung.should_promote("e", 0.1)
+
+
+def test_decisions_are_bounded():
+    rung = PromotionRung(eta=2, max_decisions=2)
+    for key in "abc":
+        rung.should_promote(key, 0.5)
+    assert list(rung._decisions) == ["b", "c"]
+
+
+def test_stats():
+    rung = PromotionRung(eta=2)
+    assert rung.stats()["cascade_promotion_rate"] == 0.0
+    for key, score in [("a", 0.5), ("b", 0.7), ("c", 0.1), ("d", 0.9)]:
+        rung.should_promote(key, score)
+    stats = rung.stats()
+    assert stats["cascade_screened"] == 4
+    assert stats["cascade_promoted"] == 3
+    assert stats["cascade_promotion_rate"] == 0.75
+    assert stats["cascade_threshold"] == 0.7
+
+
+# --- AKZEPTANZ ---
+def test_accepts_improving_promoted_child():
+    phase = EvaluationPhase()
+    acceptance = ScreenedAcceptance(PromotionRung(eta=2), phase)
+    child = proposal([0.4, 0.5], [0.6, 0.7])
+    assert acceptance.should_accept(child, state=None)
+    # Die folgende Valset-Bewertung läuft ohne Traces: Kandidat für best_prompt merken
+    assert phase.candidate == child.candidate
+
+
+def test_rejects_child_that_does_not_beat_parent():
+    rung = PromotionRung(eta=2)
+    phase = EvaluationPhase()
+    acceptance = ScreenedAcceptance(rung, phase)
+    child = proposal([0.6, 0.6], [0.6, 0.5])
+    assert not acceptance.should_accept(child, state=None)
+    assert "nicht besser" in acceptance.reject_reason(child, state=None)
+    assert phase.candidate is None
+    # Auch abgelehnte Kinder zählen für die Schwelle
+    assert rung.screened == 1
+
+
+def test_rejects_improving_child_below_threshold():
+    rung = PromotionRung(eta=2)
+    for key, score in [("a", 0.9), ("b", 0.8), ("c", 0.7)]:
+        rung.should_promote(key, score)
+    acceptance = ScreenedAcceptance(rung, EvaluationPhase())
+    child = proposal([0.1, 0.2], [0.3, 0.4])
+    assert not acceptance.should_accept(child, state=None)
+    assert "1/2" in acceptance.reject_reason(child, state=None)
+    assert rung._decisions[candidate_key(child.candidate)] is False
+
+
+def test_candidate_key_ignores_order():
+    assert candidate_key({"a": "1", "b": "2"}) == candidate_key({"b": "2", "a": "1"})
+    assert candidate_key({"a": "1"}) != candidate_key({"a": "2"})
+
+
+# --- PHASEN ---
+def test_phase_screens_only_reflective_minibatches():
+    phase = EvaluationPhase(screening_enabled=True)
+    phase.on_optimization_start({"seed_candidate": {"predict": "seed"}})
+    assert phase.candidate == {"predict": "seed"}
+
+    phase.on_iteration_start({})
+    phase.on_evaluation_start({"capture_traces": True, "candidate_idx": 0})
+    assert phase.screening
+    phase.on_evaluation_end({"candidate_idx": 0})
+    assert phase.screening
+    phase.on_evaluation_start({"capture_traces": True, "candidate_idx": None})
+    phase.on_evaluation_end({"candidate_idx": None})
+    # Kind gesiebt: die Valset-Bewertung läuft mit dem vollen Judge
+    assert not phase.screening
+
+    phase.on_iteration_start({})
+    phase.on_evaluation_start({"capture_traces": False, "candidate_idx": None})
+    assert not phase.screening
+    phase.on_merge_attempted({"merged_candidate": {"predict": "merge"}})
+    assert phase.candidate == {"predict": "merge"}
+    phase.on_iteration_end({})
+    assert phase.candidate is None
+
+
+def test_phase_without_screen_model_never_screens():
+    phase = EvaluationPhase(screening_enabled=False)
+    phase.on_evaluation_start({"capture_traces": True, "candidate_idx": 0})
+    assert not phase.screening
@@ -0,0 +1,57 @@
+import itertools
+
+import pytest
+
+import llm_cache
+from llm_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # Streng steigende Zeitstempel, sonst ist die LRU-Reihenfolge bei schnellen Aufrufen zufällig
+    clock = itertools.count(1000.0)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: next(clock))
+    return ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+
+
+def test_put_and_get(cache):
+    key = cache.make_key(model="m", messages=[{"role": "user", "content": "hallo"}])
+    assert cache.get(key) is None
+    cache.put(key, ["antwort"])
+    assert cache.get(key) == ["antwort"]
+    assert cache.stats()["cache_hits"] == 1
+    assert cache.stats()["cache_misses"] == 1
+
+
+def test_evicts_least_recently_used(cache):
+    cache.put("a", ["A"])
+    cache.put("b", ["B"])
+    # Lesen frischt "a" auf, damit ist "b" der älteste Eintrag
+    assert cache.get("a") == ["A"]
+    cache.put("c", ["C"])
+    assert cache.stats()["cache_entries"] == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == ["A"]
+    assert cache.get("c") == ["C"]
+
+
+def test_limit_holds_over_many_puts(cache):
+    for i in range(10):
+        cache.put(f"k{i}", [str(i)])
+    assert cache.stats()["cache_entries"] == 2
+    assert cache.get("k8") == ["8"]
+    assert cache.get("k9") == ["9"]
+
+
+def test_entries_survive_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ResponseCache(path).put("k", ["v"])
+    assert ResponseCache(path).get("k") == ["v"]
+
+
+def test_namespace_changes_key(tmp_path):
+    parts = {"model": "m", "messages": [{"role": "user", "content": "hallo"}]}
+    old = ResponseCache(str(tmp_path / "a.sqlite"), namespace="Regeln v1")
+    new = ResponseCache(str(tmp_path / "b.sqlite"), namespace="Regeln v2")
+    assert old.make_key(**parts) != new.make_key(**parts)
+    assert old.make_key(**parts) == ResponseCache(str(tmp_path / "c.sqlite"), namespace="Regeln v1").make_key(**parts)
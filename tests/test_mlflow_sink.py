@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+import mlflow_sink
+from mlflow_sink import MlflowSink
+
+
+class RecordingClient:
+    def __init__(self):
+        self.metrics = []
+        self.texts = []
+
+    def log_batch(self, run_id, metrics, synchronous=True):
+        self.metrics.extend(metrics)
+
+    def log_text(self, run_id, text, artifact_file):
+        self.texts.append(artifact_file)
+
+
+class FailingClient:
+    def log_batch(self, run_id, metrics, synchronous=True):
+        raise ConnectionError("MLflow nicht erreichbar")
+
+    def log_text(self, run_id, text, artifact_file):
+        raise ConnectionError("MLflow nicht erreichbar")
+
+
+class HangingClient(FailingClient):
+    """Bleibt in log_batch hängen wie MLflows HTTP-Retries, bis release gesetzt wird."""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def log_batch(self, run_id, metrics, synchronous=True):
+        self.entered.set()
+        self.release.wait(10)
+        super().log_batch(run_id, metrics, synchronous)
+
+
+@pytest.fixture
+def make_sink(monkeypatch):
+    def make(client, **kwargs):
+        monkeypatch.setattr(mlflow_sink.mlflow, "MlflowClient", lambda: client)
+        return MlflowSink("run", **kwargs)
+    return make
+
+
+def test_close_sends_everything(make_sink):
+    client = RecordingClient()
+    sink = make_sink(client, flush_interval=60)
+    sink.log_metrics({"score": 0.5, "words": 700}, step=1)
+    sink.log_text("prompt", "best_prompt.txt")
+    sink.close(timeout=5)
+    assert len(client.metrics) == 2
+    assert client.texts == ["best_prompt.txt"]
+    assert (sink.dropped, sink.dropped_texts) == (0, 0)
+
+
+def test_close_counts_unsent_data_with_failing_client(make_sink):
+    sink = make_sink(FailingClient(), flush_interval=60)
+    sink.log_metrics({"score": 0.5, "words": 700}, step=1)
+    sink.log_metrics({"score": 0.7}, step=2)
+    sink.log_text("prompt", "best_prompt.txt")
+    sink.close(timeout=5)
+    assert sink.dropped == 3
+    assert sink.dropped_texts == 1
+
+
+def test_overflow_is_counted_once(make_sink):
+    sink = make_sink(FailingClient(), flush_interval=60, max_pending=2)
+    sink.log_metrics({f"m{i}": i for i in range(5)})
+    sink.close(timeout=5)
+    # 3 Punkte beim Drain verworfen, 2 beim Schließen nicht gesendet
+    assert sink.dropped == 5
+
+
+def test_close_with_hanging_client(make_sink):
+    client = HangingClient()
+    sink = make_sink(client, flush_interval=0.01)
+    sink.log_metrics({"score": 0.5, "words": 700})
+    assert client.entered.wait(5)
+    # Während der Thread hängt, landen neue Punkte nur in der Queue
+    sink.log_metrics({"score": 0.7})
+    sink.log_text("prompt", "best_prompt.txt")
+    sink.close(timeout=0.1)
+    client.release.set()
+    assert sink.dropped == 3
+    assert sink.dropped_texts == 1
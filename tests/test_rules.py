@@ -0,0 +1,160 @@
+import pytest
+
+from rules import (
+    ABORT_MAX_WORDS,
+    RULE_HEADER,
+    RULE_LANGUAGE,
+    RULE_LENGTH,
+    RULE_ONLY_STORY,
+    RULE_PARAGRAPHS,
+    RULE_QUESTION_END,
+    check_story,
+    count_words,
+    mark_aborted,
+    split_aborted,
+    stream_abort_reason,
+)
+
+
+def replace_title(story, title):
+    _, _, body = story.strip().partition("\n")
+    return f"{title}\n{body}"
+
+
+def split_paragraph(story):
+    """Teilt den zweiten Absatz nach dem ersten Satz: gleiche Wörter, ein Absatz mehr."""
+    blocks = story.strip().split("\n\n")
+    first, _, rest = blocks[2].partition(". ")
+    blocks[2] = f"{first}.\n\n{rest}"
+    return "\n\n".join(blocks)
+
+
+# --- GOLDSTANDARD ---
+def test_gold_stories_pass_all_mechanical_rules(gold_stories):
+    for story in gold_stories:
+        report = check_story(story)
+        assert report.failed == []
+        assert report.paragraphs == 6
+        assert not report.hard_fail
+
+
+def test_gold_stories_are_never_aborted_while_streaming(gold_stories):
+    for story in gold_stories:
+        for end in range(1, len(story) + 1, 40):
+            assert stream_abort_reason(story[:end]) is None
+        assert stream_abort_reason(story) is None
+
+
+@pytest.mark.parametrize("title", [
+    "### Natürlich! Ich träume vom Mond",
+    "### Klar, sicher und geborgen",
+    "### Gerne gesehen im Wolkenschloss",
+    "### Hier ist der Mondbär zu Hause",
+])
+def test_titles_with_preamble_words_are_valid(gold_stories, title):
+    story = replace_title(gold_stories[0], title)
+    assert check_story(story).passed[RULE_ONLY_STORY]
+    assert stream_abort_reason(story) is None
+
+
+# --- VERSTÖSSE ---
+@pytest.mark.parametrize("title", [
+    "### Gerne! Hier ist deine Geschichte: Die Kristallhöhle",
+    "### Natürlich, gerne! Die Kristallhöhle",
+    "### Klar! Ich erzähle dir von der Kristallhöhle",
+    "### Here is your story: The Crystal Cave",
+])
+def test_preamble_in_title(gold_stories, title):
+    story = replace_title(gold_stories[0], title)
+    assert check_story(story).failed == [RULE_ONLY_STORY]
+    assert "Regel 8" in stream_abort_reason(story)
+
+
+def test_preamble_before_header(gold_stories):
+    story = "Gerne! Hier ist deine Geschichte:\n\n" + gold_stories[0]
+    report = check_story(story)
+    assert RULE_HEADER in report.failed
+    assert RULE_ONLY_STORY in report.failed
+    assert report.hard_fail
+    assert "Regel 1/8" in stream_abort_reason(story)
+
+
+def test_epilogue_after_story(gold_stories):
+    story = gold_stories[0] + "\n\nIch hoffe, dir gefällt die Geschichte!"
+    # Das Nachwort zählt zudem als 7. Absatz
+    assert check_story(story).failed == [RULE_PARAGRAPHS, RULE_QUESTION_END, RULE_ONLY_STORY]
+
+
+def test_missing_header(gold_stories):
+    _, _, body = gold_stories[1].strip().partition("\n")
+    report = check_story(body)
+    assert RULE_HEADER in report.failed
+    assert report.hard_fail
+
+
+def test_seven_paragraphs(gold_stories):
+    story = split_paragraph(gold_stories[0])
+    report = check_story(story)
+    assert report.failed == [RULE_PARAGRAPHS]
+    assert report.paragraphs == 7
+    assert "7. Absatz" in stream_abort_reason(story)
+
+
+def test_missing_final_question(gold_stories):
+    story = gold_stories[2].rstrip().rstrip("?") + "."
+    assert check_story(story).failed == [RULE_QUESTION_END]
+    assert stream_abort_reason(story) is None
+
+
+def test_too_long(gold_stories):
+    _, _, body = gold_stories[0].strip().partition("\n")
+    story = gold_stories[0] + "\n\n" + body
+    assert count_words(story) > ABORT_MAX_WORDS
+    report = check_story(story)
+    assert RULE_LENGTH in report.failed
+    assert "Regel 3" in stream_abort_reason(story)
+
+
+def test_too_short_is_hard_fail(gold_stories):
+    blocks = gold_stories[3].strip().split("\n\n")
+    story = "\n\n".join(blocks[:3]) + " Schläfst du schon?"
+    report = check_story(story)
+    assert RULE_LENGTH in report.failed
+    assert RULE_PARAGRAPHS in report.failed
+    assert report.hard_fail
+    assert report.passed[RULE_LANGUAGE]
+
+
+def test_english_story_is_hard_fail():
+    paragraph = (
+        "The two brothers were walking through the forest with their dog, and they had a lantern "
+        "that was glowing in the dark while the stars were shining above them. "
+    ) * 6
+    story = "### The Crystal Cave\n\n" + "\n\n".join([paragraph] * 6) + "Are you asleep?"
+    report = check_story(story)
+    assert RULE_LANGUAGE in report.failed
+    assert report.hard_fail
+
+
+def test_empty_story():
+    report = check_story(None)
+    assert report.words == 0
+    assert report.passed_count == 0
+    assert report.hard_fail
+
+
+# --- ABBRUCH-VERMERK ---
+def test_split_aborted_without_marker(gold_stories):
+    for story in gold_stories:
+        assert split_aborted(story) == (story, None)
+
+
+def test_mark_and_split_aborted_roundtrip(gold_stories):
+    partial = split_paragraph(gold_stories[4])
+    reason = stream_abort_reason(partial)
+    marked = mark_aborted(partial, reason)
+    story, split_reason = split_aborted(marked)
+    assert split_reason == reason
+    assert story == partial.rstrip()
+    # Der Vermerk selbst darf die Regel-Checks der Story nicht verfälschen
+    assert check_story(story).failed == [RULE_PARAGRAPHS]